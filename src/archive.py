@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+import json
+import logging
+import os
+import re
+
+import psycopg
+
+from .delta import restore
+from .partitions import add_months, month_start, partition_name
+from .platforms.metrics import METRIC_COLUMN_TYPES, METRIC_COLUMNS
+
+
+# 冷数据按 平台/月 导出为 Parquet：<dir>/<platform>/<YYYY-MM>.parquet
+# 列 = 明细主键 + 类型化指标列 + 还原后的完整 activity_data（JSON 文本）
+ARCHIVE_COLUMNS: Tuple[str, ...] = ("activity_id", "type", "date_key", "platform") + METRIC_COLUMNS + ("activity_data",)
+_EXPORT_BATCH_ROWS = 10000
+_STORED_PARTITION_RE = re.compile(r"^activity_detail_p(\d{4})(\d{2})(?:_detached)?$")
+
+
+def _pyarrow() -> Tuple[Any, Any]:
+    # pyarrow 是可选依赖，只有归档读写时才需要
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("archive support requires pyarrow (pip install pyarrow)") from e
+    return pyarrow, pyarrow.parquet
+
+
+def _schema(pa: Any) -> Any:
+    arrow_types = {"TEXT": pa.string(), "BIGINT": pa.int64(), "INTEGER": pa.int32(), "NUMERIC": pa.float64()}
+    fields = [
+        ("activity_id", pa.string()),
+        ("type", pa.string()),
+        ("date_key", pa.date32()),
+        ("platform", pa.string()),
+    ]
+    fields += [(c, arrow_types[METRIC_COLUMN_TYPES[c]]) for c in METRIC_COLUMNS]
+    fields.append(("activity_data", pa.string()))
+    return pa.schema(fields)
+
+
+def archive_path(directory: str, platform: str, month: date) -> Path:
+    return Path(directory) / platform / f"{month.year:04d}-{month.month:02d}.parquet"
+
+
+def archived_months(directory: str, platform: str) -> List[date]:
+    months = []
+    for path in sorted((Path(directory) / platform).glob("*.parquet")):
+        try:
+            year, month = path.stem.split("-")
+            months.append(date(int(year), int(month), 1))
+        except ValueError:
+            continue
+    return months
+
+
+def _month_source(cur: psycopg.Cursor, month: date) -> Optional[str]:
+    # retention 之后该月可能已 detach 并改名为 *_detached，仍可从中导出
+    for name in (partition_name(month), f"{partition_name(month)}_detached"):
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+        if cur.fetchone()[0]:
+            return name
+    return None
+
+
+def _export_rows(conn: psycopg.Connection, source: str, platform: str) -> Iterator[Tuple[Any, ...]]:
+    metric_sql = ", ".join(f"d.{c}" for c in METRIC_COLUMNS)
+    # 命名游标在服务端分批取数，整月数据不会一次性读进内存
+    with conn.cursor(name=f"archive_{source}") as cur:
+        cur.itersize = _EXPORT_BATCH_ROWS
+        cur.execute(
+            f"""
+            SELECT d.activity_id, d.type, d.date_key, d.platform, {metric_sql},
+                   d.activity_data, d.storage_kind, b.activity_data
+            FROM {source} d
+            LEFT JOIN {source} b
+              ON d.storage_kind = 'delta'
+             AND b.platform = d.platform
+             AND b.activity_id = d.activity_id
+             AND b.date_key = d.base_date
+            WHERE d.platform = %s
+            ORDER BY d.activity_id, d.date_key
+            """,
+            (platform,),
+        )
+        metrics_end = 4 + len(METRIC_COLUMNS)
+        for r in cur:
+            document = restore(r[metrics_end], r[metrics_end + 1], r[metrics_end + 2])
+            metrics = tuple(float(v) if isinstance(v, Decimal) else v for v in r[4:metrics_end])
+            yield r[:4] + metrics + (json.dumps(document, ensure_ascii=False, sort_keys=True),)
+
+
+def export_month(conn: psycopg.Connection, directory: str, platform: str, month: date, overwrite: bool = False) -> Optional[Path]:
+    pa, pq = _pyarrow()
+    log = logging.getLogger(__name__)
+    month = month_start(month)
+    if month >= month_start(date.today()):
+        raise ValueError(f"month {month.isoformat()} is not closed yet")
+    path = archive_path(directory, platform, month)
+    if path.exists() and not overwrite:
+        log.info("archive_skip platform=%s month=%s reason=exists", platform, month.isoformat())
+        return None
+    schema = _schema(pa)
+    tmp_path = path.with_suffix(".parquet.tmp")
+    rows_written = 0
+    try:
+        with conn.cursor() as cur:
+            source = _month_source(cur, month)
+        if source is None:
+            log.info("archive_skip platform=%s month=%s reason=no_partition", platform, month.isoformat())
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with pq.ParquetWriter(str(tmp_path), schema, compression="zstd") as writer:
+            batch: List[Tuple[Any, ...]] = []
+            for row in _export_rows(conn, source, platform):
+                batch.append(row)
+                if len(batch) >= _EXPORT_BATCH_ROWS:
+                    writer.write_table(pa.Table.from_pylist([dict(zip(ARCHIVE_COLUMNS, r)) for r in batch], schema=schema))
+                    rows_written += len(batch)
+                    batch = []
+            if batch:
+                writer.write_table(pa.Table.from_pylist([dict(zip(ARCHIVE_COLUMNS, r)) for r in batch], schema=schema))
+                rows_written += len(batch)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+    if rows_written == 0:
+        tmp_path.unlink()
+        log.info("archive_skip platform=%s month=%s reason=empty", platform, month.isoformat())
+        return None
+    os.replace(tmp_path, path)
+    log.info("archive_export platform=%s month=%s rows=%s path=%s", platform, month.isoformat(), rows_written, path)
+    return path
+
+
+def _read_month(directory: str, platform: str, month: date, columns: Sequence[str],
+                start: date, end: date, activity_id: Optional[str]) -> Any:
+    _, pq = _pyarrow()
+    filters: List[Tuple[str, str, Any]] = [("date_key", ">=", start), ("date_key", "<=", end)]
+    if activity_id:
+        filters.append(("activity_id", "==", activity_id))
+    return pq.read_table(str(archive_path(directory, platform, month)), columns=list(columns), filters=filters)
+
+
+def _months_between(directory: str, platform: str, start: date, end: date) -> List[date]:
+    if start > end:
+        return []
+    return [m for m in archived_months(directory, platform) if month_start(start) <= m <= month_start(end)]
+
+
+def read_archived_rows(
+    directory: str,
+    platform: str,
+    columns: Sequence[str],
+    start: date,
+    end: date,
+    activity_id: Optional[str] = None,
+) -> List[Tuple[Any, ...]]:
+    # 按 columns 顺序返回 [start, end] 范围内的归档行（按 activity_id, date_key 排序），只读取需要的列
+    months = _months_between(directory, platform, start, end)
+    if not months:
+        return []
+    pa, _ = _pyarrow()
+    tables = [_read_month(directory, platform, m, columns, start, end, activity_id) for m in months]
+    table = pa.concat_tables(tables).sort_by([("activity_id", "ascending"), ("date_key", "ascending")])
+    return list(zip(*(table.column(c).to_pylist() for c in columns)))
+
+
+def iter_archived_rows(
+    directory: str,
+    platform: str,
+    columns: Sequence[str],
+    start: date,
+    end: date,
+    activity_id: Optional[str] = None,
+    batch_size: int = 5000,
+) -> Iterator[Tuple[Any, ...]]:
+    # 导出用：逐月读取、按批转换，内存只占一个月的列数据；月内按 activity_id, date_key 排序
+    for month in _months_between(directory, platform, start, end):
+        table = _read_month(directory, platform, month, columns, start, end, activity_id)
+        table = table.sort_by([("activity_id", "ascending"), ("date_key", "ascending")])
+        for batch in table.to_batches(max_chunksize=batch_size):
+            yield from zip(*(batch.column(i).to_pylist() for i in range(len(columns))))
+
+
+def archive_boundary(retention_months: int) -> Optional[date]:
+    # 保留窗口起点：更早的数据可能已被 retention 移出数据库，需要从归档读取
+    if retention_months < 1:
+        return None
+    return add_months(month_start(date.today()), -(retention_months - 1))
+
+
+def stored_months(cur: psycopg.Cursor) -> List[date]:
+    # 数据库中仍可导出的月份：挂载中的分区和 retention detach 后保留的分区
+    cur.execute("SELECT relname FROM pg_class WHERE relkind IN ('r', 'p') AND relname LIKE %s", ("activity_detail_p%",))
+    months = set()
+    for (name,) in cur.fetchall():
+        match = _STORED_PARTITION_RE.match(name)
+        if match:
+            months.add(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+__all__ = [
+    "ARCHIVE_COLUMNS",
+    "archive_boundary",
+    "archive_path",
+    "archived_months",
+    "export_month",
+    "iter_archived_rows",
+    "read_archived_rows",
+    "stored_months",
+]
@@ -1,18 +1,28 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
+from datetime import date
 import json
 import logging
-from typing import List
+import sys
+import time
+from typing import Iterator, List, Set, Tuple
 
-from .db import Database
+from .archive import archive_boundary, export_month, stored_months
+from .db import Database, WriteStats
+from .storage import ActivityStore, open_database
+from .partitions import month_start
 from .platforms.common.config import BaseConfig
+from .platforms.common.raw_json import RawJson, RawPayload
 from .platforms.tiga.config import TigaConfig
 from .platforms.tiga.http_client import TigaHttpClient
 from .platforms.tiga.scraper import TigaScraper
 from .platforms.gaia.config import GaiaConfig
-from .platforms.gaia.http_client import GaiaHttpClient
+from .platforms.gaia.http_client import GaiaAsyncHttpClient, GaiaHttpClient
 from .platforms.gaia.scraper import GaiaScraper
+from .platforms.gaia.async_scraper import AsyncGaiaScraper
+from .platforms.gaia.sharded import run_sharded
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -27,10 +37,52 @@ def build_parser() -> argparse.ArgumentParser:
     p_gaia.add_argument("--catalogs", nargs="+", help="分类列表，默认从环境变量读取")
     p_gaia.add_argument("--max-pages", type=int, help="每个分类最大抓取页数（可选）")
     p_gaia.add_argument("--interval-minutes", type=int, help="定时运行间隔分钟数（可选，不指定则仅运行一次）")
+    p_gaia.add_argument("--workers", type=int, default=1, help="按分类分片的抓取进程数（默认 1，即单进程）")
+    p_gaia.add_argument("--engine", choices=["sync", "async"], default="sync", help="抓取引擎：sync 线程流水线，async 协程（并发度均为 GAIA_CONCURRENCY）")
+
+    p_retention = sub.add_parser("retention", help="按月分区清理过期数据")
+    p_retention.add_argument("--keep-months", type=int, help="保留的月数（含当月），默认取 RETENTION_MONTHS")
+    p_retention.add_argument("--drop", action="store_true", help="直接删除过期分区（默认仅 detach 并改名保留）")
+
+    p_rollup = sub.add_parser("rollup", help="重建趋势汇总表 activity_daily_rollup")
+    p_rollup.add_argument("--days", type=int, default=7, help="重建最近多少天（默认 7）")
+
+    p_ingest = sub.add_parser("ingest", help="从 JSONL 批量导入活动快照（COPY + 合并，可重复执行）")
+    p_ingest.add_argument("paths", nargs="*", default=["-"], help="JSONL 文件，每行含 activity_id/type/date_key/platform/activity_data；- 为标准输入（默认）")
+    p_ingest.add_argument("--chunk-size", type=int, default=5000, help="每次 COPY 合并提交的行数（默认 5000）")
+
+    p_archive = sub.add_parser("archive", help="把已结束月份按平台导出为 Parquet（需要 pyarrow）")
+    p_archive.add_argument("--dir", help="归档目录，默认取 ARCHIVE_DIR")
+    p_archive.add_argument("--platforms", nargs="+", default=["tiga", "gaia"], help="平台列表（默认全部）")
+    p_archive.add_argument("--months", nargs="+", help="指定月份 YYYY-MM；默认导出保留窗口（RETENTION_MONTHS）之外、尚未归档的月份")
+    p_archive.add_argument("--overwrite", action="store_true", help="覆盖已存在的归档文件")
 
     return p
 
 
+def iter_ingest_records(paths: List[str]) -> Iterator[Tuple[str, str, str, str, RawJson]]:
+    for path in paths:
+        with (contextlib.nullcontext(sys.stdin) if path == "-" else open(path, encoding="utf-8")) as fh:
+            for lineno, line in enumerate(fh, 1):
+                if not line.strip():
+                    continue
+                try:
+                    # activity_data 保留行内原文入库，不做解析后再序列化
+                    rec = RawPayload(line)
+                    activity_data = rec.raw("activity_data")
+                    if activity_data is None:
+                        raise KeyError("activity_data")
+                    yield (
+                        str(rec["activity_id"]),
+                        str(rec["type"]),
+                        date.fromisoformat(str(rec["date_key"])).isoformat(),
+                        str(rec["platform"]),
+                        activity_data,
+                    )
+                except (ValueError, KeyError, TypeError) as e:
+                    raise ValueError(f"{path}:{lineno}: invalid ingest record ({e!r})") from e
+
+
 def main(argv: List[str] | None = None) -> int:
     args = build_parser().parse_args(argv)
     logging.basicConfig(
@@ -39,10 +91,15 @@ def main(argv: List[str] | None = None) -> int:
     )
     
     base_config = BaseConfig.from_env()
-    db = Database.open(base_config.database_url)
+    db = open_database(base_config)
+    try:
+        return run_command(args, base_config, db)
+    finally:
+        db.close()
 
+
+def run_command(args: argparse.Namespace, base_config: BaseConfig, db: ActivityStore) -> int:
     if args.command == "tiga":
-        import time
         tiga_config = TigaConfig()
         tiga_http = TigaHttpClient(base_config, tiga_config)
         tiga_scraper = TigaScraper(db, tiga_http, tiga_config)
@@ -53,34 +110,113 @@ def main(argv: List[str] | None = None) -> int:
         logging.getLogger(__name__).info("tiga_scheduler_started interval_min=%s", interval)
         while True:
             logging.getLogger(__name__).info("tiga_tick_start")
-            tiga_scraper.scrape_activities(max_pages=max_pages)
+            tiga_scraper.run(max_pages=max_pages)
             logging.getLogger(__name__).info("tiga_tick_end sleeping_min=%s", interval)
             time.sleep(max(1, int(interval)) * 60)
         return 0
     
     elif args.command == "gaia":
-        import time
         gaia_config = GaiaConfig()
-        gaia_http = GaiaHttpClient(base_config, gaia_config)
-        gaia_scraper = GaiaScraper(db, gaia_http, gaia_config)
-        
         if args.catalogs:
             gaia_config.catalogs = args.catalogs
+        if args.engine == "async":
+            gaia_scraper = AsyncGaiaScraper(db, GaiaAsyncHttpClient(base_config, gaia_config), gaia_config)
+        else:
+            gaia_scraper = GaiaScraper(db, GaiaHttpClient(base_config, gaia_config), gaia_config)
         max_pages = args.max_pages or gaia_config.max_pages
         interval = args.interval_minutes
+
+        def gaia_tick() -> None:
+            if args.workers > 1:
+                run_sharded(gaia_config.catalogs, args.workers, max_pages=max_pages, engine=args.engine)
+            else:
+                gaia_scraper.run(max_pages=max_pages)
         
         if interval:
             logging.getLogger(__name__).info("gaia_scheduler_started catalogs=%s interval_min=%s", gaia_config.catalogs, interval)
             while True:
                 logging.getLogger(__name__).info("gaia_tick_start")
-                gaia_scraper.scrape_activities(max_pages=max_pages)
+                gaia_tick()
                 logging.getLogger(__name__).info("gaia_tick_end sleeping_min=%s", interval)
                 time.sleep(max(1, int(interval)) * 60)
         else:
-            logging.getLogger(__name__).info("gaia_single_run catalogs=%s", gaia_config.catalogs)
-            gaia_scraper.scrape_activities(max_pages=max_pages)
+            logging.getLogger(__name__).info("gaia_single_run catalogs=%s engine=%s workers=%s", gaia_config.catalogs, args.engine, args.workers)
+            gaia_tick()
         return 0
     
+    elif args.command == "retention":
+        keep_months = args.keep_months or base_config.retention_months
+        if keep_months < 1:
+            logging.getLogger(__name__).error("retention_skipped reason=keep_months_not_set")
+            return 2
+        expired = db.apply_retention(keep_months, drop=args.drop)
+        db.bump_data_version()
+        print(json.dumps({"keep_months": keep_months, "drop": args.drop, "expired": expired}, ensure_ascii=False))
+        return 0
+
+    elif args.command == "rollup":
+        from datetime import timedelta
+        since = date.today() - timedelta(days=max(1, args.days) - 1)
+        rows = db.refresh_rollup(since)
+        db.bump_data_version()
+        print(json.dumps({"since": since.isoformat(), "rows": rows}, ensure_ascii=False))
+        return 0
+
+    elif args.command == "ingest":
+        log = logging.getLogger(__name__)
+
+        def report(rows: int, stats: WriteStats, elapsed: float) -> None:
+            log.info(
+                "ingest_progress rows=%s inserted=%s changed=%s unchanged=%s rows_per_sec=%.0f",
+                rows, stats.inserted, stats.changed, stats.unchanged, rows / elapsed if elapsed > 0 else 0.0,
+            )
+
+        platforms: Set[str] = set()
+
+        def records() -> Iterator[Tuple[str, str, str, str, RawJson]]:
+            for record in iter_ingest_records(args.paths):
+                platforms.add(record[3])
+                yield record
+
+        started = time.monotonic()
+        stats = db.bulk_ingest(records(), chunk_size=max(1, args.chunk_size), progress=report)
+        elapsed = time.monotonic() - started
+        for platform in sorted(platforms):
+            db.bump_data_version(platform)
+        print(json.dumps({
+            "rows": stats.total,
+            "inserted": stats.inserted,
+            "changed": stats.changed,
+            "unchanged": stats.unchanged,
+            "elapsed_s": round(elapsed, 1),
+            "rows_per_sec": round(stats.total / elapsed) if elapsed > 0 else 0,
+        }, ensure_ascii=False))
+        return 0
+
+    elif args.command == "archive":
+        directory = args.dir or base_config.archive_dir
+        if not directory:
+            logging.getLogger(__name__).error("archive_skipped reason=archive_dir_not_set")
+            return 2
+        if not isinstance(db, Database):
+            logging.getLogger(__name__).error("archive_skipped reason=postgres_only")
+            return 2
+        before = archive_boundary(base_config.retention_months) or month_start(date.today())
+        if args.months:
+            months = [date.fromisoformat(f"{m}-01") for m in args.months]
+        else:
+            with db.conn.cursor() as cur:
+                months = [m for m in stored_months(cur) if m < before]
+            db.conn.commit()
+        exported = []
+        for platform in args.platforms:
+            for month in months:
+                path = export_month(db.conn, directory, platform, month, overwrite=args.overwrite)
+                if path is not None:
+                    exported.append(str(path))
+        print(json.dumps({"months": [m.isoformat()[:7] for m in months], "exported": exported}, ensure_ascii=False))
+        return 0
+
     return 1
 
 
@@ -1,19 +1,118 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import psycopg
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import logging
+import threading
 import time
-from typing import Any, Dict
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .delta import diff, restore
+from .migrations import run_migrations
+from .rollup import ROLLUP_TABLE, upsert_rollup_sql
+from .partitions import add_months, ensure_partitions, expire_partitions, month_start
+from .platforms.common.raw_json import ActivityData, RawJson
+from .platforms.metrics import METRIC_COLUMN_TYPES, METRIC_COLUMNS, extract_metrics
+
+
+# (activity_id, type, date_key, platform, activity_data, content_hash, storage_kind, base_date, *METRIC_COLUMNS)
+DetailRow = Tuple[Any, ...]
+DETAIL_COLUMNS: Tuple[str, ...] = (
+    "activity_id", "type", "date_key", "platform", "activity_data", "content_hash", "storage_kind", "base_date",
+) + METRIC_COLUMNS
+
+STORAGE_MODES = ("full", "delta")
+
+BUMP_DATA_VERSION_SQL = """
+    INSERT INTO data_version (platform, version) VALUES (%s, 1)
+    ON CONFLICT (platform) DO UPDATE SET version = data_version.version + 1, updated_at = NOW()
+"""
+
+
+@dataclass
+class WriteStats:
+    inserted: int = 0
+    changed: int = 0
+    unchanged: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.inserted + self.changed + self.unchanged
+
+
+def ingest_in_chunks(
+    records: Iterable[Tuple[str, str, Any, str, ActivityData]],
+    chunk_size: int,
+    build_row: Callable[[str, str, Any, str, ActivityData], DetailRow],
+    write_chunk: Callable[[List[DetailRow]], WriteStats],
+    progress: Optional[Callable[[int, WriteStats, float], None]] = None,
+) -> WriteStats:
+    # (activity_id, type, date_key, platform, activity_data) 按 chunk_size 分块写入，每块单独提交，中断后重跑是幂等的
+    total = WriteStats()
+    done = 0
+    started = time.monotonic()
+    chunk: Dict[Tuple[str, str, str], DetailRow] = {}
+
+    def flush_chunk() -> None:
+        nonlocal done
+        rows = list(chunk.values())
+        batch = write_chunk(rows)
+        total.inserted += batch.inserted
+        total.changed += batch.changed
+        total.unchanged += batch.unchanged
+        done += len(rows)
+        chunk.clear()
+        if progress is not None:
+            progress(done, total, time.monotonic() - started)
+
+    for activity_id, type_text, date_key, platform, activity_data in records:
+        # 同一块内重复的键只保留最后一条（ON CONFLICT DO UPDATE 不能在一条语句里改同一行两次）
+        chunk[(activity_id, str(date_key), platform)] = build_row(activity_id, type_text, date_key, platform, activity_data)
+        if len(chunk) >= chunk_size:
+            flush_chunk()
+    if chunk:
+        flush_chunk()
+    elapsed = time.monotonic() - started
+    logging.getLogger(__name__).info(
+        "db_bulk_ingest rows=%s inserted=%s changed=%s unchanged=%s elapsed_s=%.1f rows_per_sec=%.0f",
+        done, total.inserted, total.changed, total.unchanged, elapsed, done / elapsed if elapsed > 0 else 0.0,
+    )
+    return total
 
 
 @dataclass
 class Database:
     conn: psycopg.Connection
+    batch_size: int = 1
+    flush_interval_seconds: float = 5.0
+    partition_months_ahead: int = 3
+    storage_mode: str = "full"
+    delta_max_ratio: float = 0.5
+    _partition_months: Set[date] = field(default_factory=set, repr=False)
+    _lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+    # 按唯一键去重的待写缓冲，同一批次内后写覆盖先写
+    _pending: Dict[Tuple[str, str, str], DetailRow] = field(default_factory=dict, repr=False)
+    _pending_since: Optional[float] = field(default=None, repr=False)
+    _pending_membership: Set[Tuple[str, str, str, str]] = field(default_factory=set, repr=False)
+    _write_stats: Dict[str, WriteStats] = field(default_factory=dict, repr=False)
+    # (platform, activity_id) -> (写入日期, 同月内更早的完整快照日期)；快照内容按批读取，不常驻内存
+    _base_dates: Dict[Tuple[str, str], Tuple[date, Optional[date]]] = field(default_factory=dict, repr=False)
 
     @classmethod
-    def open(cls, database_url: str) -> "Database":
+    def open(
+        cls,
+        database_url: str,
+        batch_size: int = 1,
+        flush_interval_seconds: float = 5.0,
+        partition_months_ahead: int = 3,
+        storage_mode: str = "full",
+        delta_max_ratio: float = 0.5,
+    ) -> "Database":
+        if storage_mode not in STORAGE_MODES:
+            raise ValueError(f"unknown storage mode: {storage_mode}")
         log = logging.getLogger(__name__)
         # 简单重试以应对容器启动时数据库尚未就绪
         last_err: Exception | None = None
@@ -29,61 +128,363 @@ class Database:
         else:
             # 用最后一次异常抛出
             raise last_err  # type: ignore[misc]
-        db = cls(conn)
+        db = cls(
+            conn,
+            batch_size=max(1, batch_size),
+            flush_interval_seconds=flush_interval_seconds,
+            partition_months_ahead=max(0, partition_months_ahead),
+            storage_mode=storage_mode,
+            delta_max_ratio=delta_max_ratio,
+        )
         db._init_schema()
         log.info("db_open")
         return db
 
     def _init_schema(self) -> None:
-        log = logging.getLogger(__name__)
-        with self.conn.cursor() as cur:
-            # 检查表是否已存在
-            cur.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_schema = 'public' 
-                    AND table_name = 'activity_detail'
-                );
-            """)
-            table_exists = cur.fetchone()[0]
-            
-            if not table_exists:
-                log.info("Creating activity_detail table as it doesn't exist")
-                cur.execute(
-                    """
-                    CREATE TABLE activity_detail (
-                        id SERIAL PRIMARY KEY,
-                        activity_id TEXT NOT NULL,
-                        type TEXT NOT NULL,
-                        date_key TEXT NOT NULL,
-                        platform TEXT NOT NULL,
-                        activity_data JSONB NOT NULL,
-                        created_at TIMESTAMP DEFAULT NOW(),
-                        UNIQUE(activity_id, date_key, platform)
-                    );
-                    """
-                )
-                self.conn.commit()
-                log.info("activity_detail table created successfully")
-            else:
-                log.info("activity_detail table already exists, skipping creation")
+        run_migrations(self.conn)
+        with self.conn.transaction():
+            with self.conn.cursor() as cur:
+                covered = self._ensure_partitions(cur, [date.today()])
+        self._partition_months |= covered
 
-    def save_activity_detail(self, activity_id: str, date_key: str, activity_data: Dict[str, Any], type_text: str, platform: str) -> None:
-        logging.getLogger(__name__).info(
+    def _ensure_partitions(self, cur: psycopg.Cursor, days: List[date]) -> Set[date]:
+        # 常驻的定时抓取进程跨月、或回灌历史数据时按需补建分区；已覆盖的月份不再访问数据库。
+        # 返回本次新覆盖的月份，由调用方在事务提交成功后记入 _partition_months（回滚会撤销建表）
+        missing = {month_start(day) for day in days} - self._partition_months
+        if not missing:
+            return set()
+        covered: Set[date] = set()
+        month = min(missing)
+        last = ensure_partitions(cur, month, self.partition_months_ahead, end=max(missing))
+        while month <= last:
+            covered.add(month)
+            month = add_months(month, 1)
+        return covered
+
+    @staticmethod
+    def _detail_row(activity_id: str, type_text: str, date_key: Any, platform: str, activity_data: ActivityData) -> DetailRow:
+        # 序列化结果既用于入库也用于计算内容哈希，内容不变时跳过重写；
+        # 抓取器传来的 RawJson 直接用上游原文，dict 则按键排序后序列化
+        if isinstance(activity_data, RawJson):
+            payload, document = activity_data.text, activity_data.value
+        else:
+            payload, document = json.dumps(activity_data, ensure_ascii=False, sort_keys=True), activity_data
+        content_hash = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return (activity_id, type_text, date_key, platform, payload, content_hash, "full", None) + extract_metrics(platform, document)
+
+    def save_activity_detail(self, activity_id: str, date_key: str, activity_data: ActivityData, type_text: str, platform: str) -> None:
+        logging.getLogger(__name__).debug(
             "db_upsert_detail activity_id=%s date_key=%s platform=%s", activity_id, date_key, platform
         )
-        with self.conn.cursor() as cur:
+        row = self._detail_row(activity_id, type_text, date_key, platform, activity_data)
+        with self._lock:
+            self._pending[(activity_id, date_key, platform)] = row
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            if (len(self._pending) >= self.batch_size
+                    or time.monotonic() - self._pending_since >= self.flush_interval_seconds):
+                self.flush()
+
+    def save_membership(self, activity_id: str, date_key: str, type_text: str, platform: str) -> None:
+        # 活动与分类/类型的从属关系，同一活动出现在多个分类时每个分类各记一条
+        with self._lock:
+            self._pending_membership.add((activity_id, date_key, platform, type_text))
+
+    def _merge_details(self, cur: psycopg.Cursor, rows: List[DetailRow]) -> List[Tuple[str, bool]]:
+        # COPY 进会话级临时表，再一条语句合并
+        metric_defs = ",\n".join(f"{c} {METRIC_COLUMN_TYPES[c]}" for c in METRIC_COLUMNS)
+        cur.execute(
+            f"""
+            CREATE TEMP TABLE IF NOT EXISTS activity_detail_staging (
+                activity_id TEXT NOT NULL,
+                type TEXT NOT NULL,
+                date_key DATE NOT NULL,
+                platform TEXT NOT NULL,
+                activity_data JSONB NOT NULL,
+                content_hash TEXT NOT NULL,
+                storage_kind TEXT NOT NULL,
+                base_date DATE,
+                {metric_defs}
+            ) ON COMMIT DELETE ROWS
+            """
+        )
+        columns = ", ".join(DETAIL_COLUMNS)
+        with cur.copy(f"COPY activity_detail_staging ({columns}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+        self._rebase_dependents(cur)
+        # 哈希相同的行不产生新版本；RETURNING 只返回新插入和内容变化的行
+        updates = ",\n".join(f"{c} = EXCLUDED.{c}" for c in ("activity_data", "content_hash", "storage_kind", "base_date") + METRIC_COLUMNS)
+        cur.execute(
+            f"""
+            INSERT INTO activity_detail ({columns})
+            SELECT {columns} FROM activity_detail_staging
+            ON CONFLICT (activity_id, date_key, platform) DO UPDATE SET
+                {updates}
+            WHERE activity_detail.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+            RETURNING platform, (xmax = 0) AS inserted
+            """
+        )
+        written = cur.fetchall()
+        # 趋势汇总表在同一事务内随明细更新
+        cur.execute(upsert_rollup_sql("activity_detail_staging"))
+        return written
+
+    def _rebase_dependents(self, cur: psycopg.Cursor) -> int:
+        # 即将被改写的完整快照若是同月增量行的基准（回灌历史、重载某天），先把这些增量行还原为完整快照
+        cur.execute(
+            """
+            SELECT d.platform, d.activity_id, d.date_key, d.activity_data, b.activity_data
+            FROM activity_detail_staging s
+            JOIN activity_detail b
+              ON b.platform = s.platform
+             AND b.activity_id = s.activity_id
+             AND b.date_key = s.date_key
+             AND b.storage_kind = 'full'
+             AND b.content_hash IS DISTINCT FROM s.content_hash
+            JOIN activity_detail d
+              ON d.platform = b.platform
+             AND d.activity_id = b.activity_id
+             AND d.date_key > b.date_key
+             AND d.date_key < (date_trunc('month', b.date_key) + interval '1 month')::date
+             AND d.storage_kind = 'delta'
+             AND d.base_date = b.date_key
+            """
+        )
+        dependents = cur.fetchall()
+        if dependents:
+            cur.executemany(
+                """
+                UPDATE activity_detail SET activity_data = %s, storage_kind = 'full', base_date = NULL
+                WHERE platform = %s AND activity_id = %s AND date_key = %s
+                """,
+                [
+                    (json.dumps(restore(patch, "delta", base), ensure_ascii=False, sort_keys=True), platform, activity_id, day)
+                    for platform, activity_id, day, patch, base in dependents
+                ],
+            )
+            for platform, activity_id, _day, _patch, _base in dependents:
+                self._base_dates.pop((platform, activity_id), None)
+            logging.getLogger(__name__).info("db_rebase_deltas rows=%s", len(dependents))
+        return len(dependents)
+
+    def _load_bases(self, cur: psycopg.Cursor, rows: List[DetailRow]) -> Dict[Tuple[str, str], Tuple[date, date, Any]]:
+        # 返回本批各活动的 (写入日期, 基准日期, 基准内容)。基准为同月分区内、早于写入日期的最近一份完整快照：
+        # 每个活动每天查一次基准日期并缓存，之后的批次按缓存的日期直接取快照内容
+        days: Dict[Tuple[str, str], date] = {}
+        for row in rows:
+            key, day = (row[3], row[0]), date.fromisoformat(str(row[2]))
+            days[key] = max(day, days.get(key, day))
+        bases: Dict[Tuple[str, str], Tuple[date, date, Any]] = {}
+        misses = [key for key in days if self._base_dates.get(key, (None, None))[0] != days[key]]
+        if misses:
             cur.execute(
                 """
-                INSERT INTO activity_detail (activity_id, type, date_key, platform, activity_data)
-                VALUES (%s, %s, %s, %s, %s)
-                ON CONFLICT (activity_id, date_key, platform) DO UPDATE SET
-                    activity_data = EXCLUDED.activity_data
+                SELECT DISTINCT ON (d.platform, d.activity_id) d.platform, d.activity_id, d.date_key, d.activity_data
+                FROM unnest(%s::text[], %s::text[], %s::date[]) AS k(platform, activity_id, day)
+                JOIN activity_detail d
+                  ON d.platform = k.platform
+                 AND d.activity_id = k.activity_id
+                 AND d.date_key >= date_trunc('month', k.day)::date
+                 AND d.date_key < k.day
+                 AND d.storage_kind = 'full'
+                ORDER BY d.platform, d.activity_id, d.date_key DESC
                 """,
-                (activity_id, type_text, date_key, platform, json.dumps(activity_data, ensure_ascii=False)),
+                ([k[0] for k in misses], [k[1] for k in misses], [days[k] for k in misses]),
             )
-            self.conn.commit()
+            found = {(platform, activity_id): (day, data) for platform, activity_id, day, data in cur.fetchall()}
+            for key in misses:
+                base_date, base = found.get(key, (None, None))
+                self._base_dates[key] = (days[key], base_date)
+                if base_date is not None:
+                    bases[key] = (days[key], base_date, base)
+        cached = [key for key in days if key not in bases and self._base_dates[key][1] is not None]
+        if cached:
+            cur.execute(
+                """
+                SELECT d.platform, d.activity_id, d.activity_data
+                FROM unnest(%s::text[], %s::text[], %s::date[]) AS k(platform, activity_id, day)
+                JOIN activity_detail d
+                  ON d.platform = k.platform
+                 AND d.activity_id = k.activity_id
+                 AND d.date_key = k.day
+                 AND d.storage_kind = 'full'
+                """,
+                ([k[0] for k in cached], [k[1] for k in cached], [self._base_dates[k][1] for k in cached]),
+            )
+            for platform, activity_id, data in cur.fetchall():
+                day, base_date = self._base_dates[(platform, activity_id)]
+                bases[(platform, activity_id)] = (day, base_date, data)
+        return bases
+
+    def _encode_deltas(self, cur: psycopg.Cursor, rows: List[DetailRow]) -> List[DetailRow]:
+        # 基准限定在同一月分区内：每月第一次写入必为完整快照，retention 整月删除分区不会留下失去基准的增量；
+        # 补丁超过完整内容的 delta_max_ratio 视为变化较大，改存完整快照，作为之后几天的新基准
+        bases = self._load_bases(cur, rows)
+        encoded = []
+        for row in rows:
+            base = bases.get((row[3], row[0]))
+            if base is not None and base[0] == date.fromisoformat(str(row[2])):
+                patch = json.dumps(diff(base[2], json.loads(row[4])), ensure_ascii=False, sort_keys=True)
+                if len(patch) <= self.delta_max_ratio * len(row[4]):
+                    row = row[:4] + (patch, row[5], "delta", base[1]) + row[8:]
+            encoded.append(row)
+        return encoded
+
+    def _record_write_stats(self, rows: List[DetailRow], written: List[Tuple[str, bool]]) -> WriteStats:
+        submitted: Dict[str, int] = {}
+        for row in rows:
+            submitted[row[3]] = submitted.get(row[3], 0) + 1
+        batch = WriteStats()
+        for platform, count in submitted.items():
+            stats = self._write_stats.setdefault(platform, WriteStats())
+            inserted = sum(1 for p, ins in written if p == platform and ins)
+            changed = sum(1 for p, ins in written if p == platform and not ins)
+            stats.inserted += inserted
+            stats.changed += changed
+            stats.unchanged += count - inserted - changed
+            batch.inserted += inserted
+            batch.changed += changed
+        batch.unchanged = len(rows) - batch.inserted - batch.changed
+        return batch
+
+    def flush(self) -> int:
+        log = logging.getLogger(__name__)
+        with self._lock:
+            if not self._pending and not self._pending_membership:
+                return 0
+            rows = list(self._pending.values())
+            memberships = list(self._pending_membership)
+            started = time.monotonic()
+            covered: Set[date] = set()
+            try:
+                with self.conn.cursor() as cur:
+                    if rows:
+                        covered = self._ensure_partitions(cur, [date.fromisoformat(str(row[2])) for row in rows])
+                    if rows and self.storage_mode == "delta":
+                        written = self._merge_details(cur, self._encode_deltas(cur, rows))
+                    else:
+                        written = self._merge_details(cur, rows) if rows else []
+                    if memberships:
+                        cur.executemany(
+                            """
+                            INSERT INTO activity_membership (activity_id, date_key, platform, type)
+                            VALUES (%s, %s, %s, %s)
+                            ON CONFLICT DO NOTHING
+                            """,
+                            memberships,
+                        )
+                # 整批只提交一次
+                self.conn.commit()
+            except Exception:
+                # 回滚后保留缓冲，下次 flush 重试，不丢数据
+                self.conn.rollback()
+                log.error("db_flush_failed rows=%s memberships=%s", len(rows), len(memberships))
+                raise
+            self._partition_months |= covered
+            self._pending.clear()
+            self._pending_membership.clear()
+            self._pending_since = None
+
+            batch = self._record_write_stats(rows, written)
+            log.info(
+                "db_flush rows=%s inserted=%s changed=%s unchanged=%s memberships=%s elapsed_ms=%s",
+                len(rows), batch.inserted, batch.changed, batch.unchanged, len(memberships),
+                int((time.monotonic() - started) * 1000),
+            )
+            return len(rows)
+
+    def bulk_ingest(
+        self,
+        records: Iterable[Tuple[str, str, Any, str, ActivityData]],
+        chunk_size: int = 5000,
+        progress: Optional[Callable[[int, WriteStats, float], None]] = None,
+    ) -> WriteStats:
+        # 回灌/重载：每块 COPY 进暂存表后合并，冲突语义与 save_activity_detail 相同。
+        # 始终写完整快照：跨多天的历史数据按天做增量没有稳定的基准
+        log = logging.getLogger(__name__)
+        self.flush()
+
+        def merge_chunk(rows: List[DetailRow]) -> WriteStats:
+            with self._lock:
+                try:
+                    with self.conn.cursor() as cur:
+                        covered = self._ensure_partitions(cur, [date.fromisoformat(str(row[2])) for row in rows])
+                        written = self._merge_details(cur, rows)
+                    self.conn.commit()
+                except Exception:
+                    self.conn.rollback()
+                    log.error("db_bulk_ingest_failed chunk=%s", len(rows))
+                    raise
+                self._partition_months |= covered
+                return self._record_write_stats(rows, written)
+
+        return ingest_in_chunks(records, chunk_size, self._detail_row, merge_chunk, progress)
+
+    def apply_retention(self, keep_months: int, drop: bool = False) -> List[str]:
+        # 保留当前月在内的 keep_months 个月，更早的整月分区 detach（或 drop），不做逐行 DELETE
+        if keep_months < 1:
+            raise ValueError("keep_months must be >= 1")
+        before = add_months(month_start(date.today()), -(keep_months - 1))
+        with self._lock:
+            try:
+                with self.conn.cursor() as cur:
+                    expired = expire_partitions(cur, before, drop=drop)
+                    cur.execute("DELETE FROM activity_membership WHERE date_key < %s", (before,))
+                    cur.execute(f"DELETE FROM {ROLLUP_TABLE} WHERE date_key < %s", (before,))
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+        logging.getLogger(__name__).info(
+            "db_retention keep_months=%s before=%s expired=%s drop=%s", keep_months, before.isoformat(), len(expired), drop
+        )
+        return expired
+
+    def refresh_rollup(self, since: date) -> int:
+        # 增量重建 since 之后的汇总行（补数据、直接改库或汇总逻辑变更后使用）
+        with self._lock:
+            try:
+                with self.conn.cursor() as cur:
+                    cur.execute(upsert_rollup_sql("activity_detail", "WHERE date_key >= %s"), (since,))
+                    count = cur.rowcount
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+        logging.getLogger(__name__).info("db_rollup_refresh since=%s rows=%s", since.isoformat(), count)
+        return count
+
+    def bump_data_version(self, platform: Optional[str] = None) -> None:
+        # 一轮抓取/导入/保留清理结束后递增数据版本，Web 进程据此让查询结果缓存失效；platform=None 时递增全部平台
+        with self._lock:
+            try:
+                with self.conn.cursor() as cur:
+                    if platform is None:
+                        cur.execute("UPDATE data_version SET version = version + 1, updated_at = NOW()")
+                    else:
+                        cur.execute(BUMP_DATA_VERSION_SQL, (platform,))
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    def take_write_stats(self, platform: str) -> WriteStats:
+        # 返回并清零该平台自上次调用以来的写入统计
+        with self._lock:
+            return self._write_stats.pop(platform, WriteStats())
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                if self._pending or self._pending_membership:
+                    logging.getLogger(__name__).error(
+                        "db_close_unflushed rows=%s memberships=%s", len(self._pending), len(self._pending_membership)
+                    )
+                self.conn.close()
 
 
-__all__ = ["Database"]
+__all__ = ["Database", "WriteStats"]
 
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import copy
+from typing import Any, Dict, List
+
+
+# JSON Patch（RFC 6902）子集：只产生 add / remove / replace，路径为 JSON Pointer。
+# 等长数组逐元素比较，长度变化的数组整体 replace，保证 apply(base, diff(base, target)) == target。
+Patch = List[Dict[str, Any]]
+
+
+def _escape(token: Any) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _same(a: Any, b: Any) -> bool:
+    # 1 == 1.0 == True 在 JSON 中是不同的值
+    return type(a) is type(b) and a == b
+
+
+def diff(base: Any, target: Any, path: str = "") -> Patch:
+    if isinstance(base, dict) and isinstance(target, dict):
+        ops: Patch = []
+        for key in base:
+            if key not in target:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in target.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in base:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                ops.extend(diff(base[key], value, child))
+        return ops
+    if isinstance(base, list) and isinstance(target, list) and len(base) == len(target):
+        ops = []
+        for index, (old, new) in enumerate(zip(base, target)):
+            ops.extend(diff(old, new, f"{path}/{index}"))
+        return ops
+    if _same(base, target):
+        return []
+    return [{"op": "replace", "path": path, "value": target}]
+
+
+def apply(base: Any, patch: Patch) -> Any:
+    doc = copy.deepcopy(base)
+    for op in patch:
+        path = op["path"]
+        if path == "":
+            doc = copy.deepcopy(op["value"])
+            continue
+        tokens = [_unescape(t) for t in path.split("/")[1:]]
+        parent = doc
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last: Any = int(tokens[-1]) if isinstance(parent, list) else tokens[-1]
+        if op["op"] == "remove":
+            del parent[last]
+        elif op["op"] in ("add", "replace"):
+            parent[last] = copy.deepcopy(op["value"])
+        else:
+            raise ValueError(f"unsupported patch op: {op['op']}")
+    return doc
+
+
+def restore(data: Any, storage_kind: str, base: Any) -> Any:
+    # activity_detail 行还原为完整文档：delta 行的 activity_data 是相对 base_date 那行的补丁
+    if storage_kind == "delta":
+        if base is None:
+            raise ValueError("delta row without base snapshot")
+        return apply(base, data)
+    return data
+
+
+__all__ = ["Patch", "apply", "diff", "restore"]
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, List, Sequence, Tuple
+import csv
+import io
+import json
+import zlib
+
+
+# 导出接口的流式序列化：逐行生成文本、按批编码（可选 gzip），不在内存中拼出完整结果
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# 每批行数：太小则 gzip 帧和 WSGI 写出的开销占比高，太大则首字节延迟变长
+BATCH_ROWS = 500
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def ndjson_lines(columns: Sequence[str], rows: Iterable[Tuple[Any, ...]]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps({c: _json_value(v) for c, v in zip(columns, row)}, ensure_ascii=False) + "\n"
+
+
+def csv_lines(columns: Sequence[str], rows: Iterable[Tuple[Any, ...]]) -> Iterator[str]:
+    # 复用同一个缓冲区，每行写完立即取出
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    for row in _with_header(columns, rows):
+        writer.writerow(row)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+
+def _with_header(columns: Sequence[str], rows: Iterable[Tuple[Any, ...]]) -> Iterator[Sequence[Any]]:
+    yield columns
+    for row in rows:
+        yield ["" if v is None else (v.isoformat() if isinstance(v, date) else v) for v in row]
+
+
+def serialize(fmt: str, columns: Sequence[str], rows: Iterable[Tuple[Any, ...]]) -> Iterator[str]:
+    if fmt == "csv":
+        return csv_lines(columns, rows)
+    if fmt == "ndjson":
+        return ndjson_lines(columns, rows)
+    raise ValueError(f"unsupported export format: {fmt}")
+
+
+def encode_chunks(lines: Iterable[str], gzip: bool = False, batch_rows: int = BATCH_ROWS) -> Iterator[bytes]:
+    # 每 batch_rows 行输出一块；gzip 时每块 Z_SYNC_FLUSH，客户端可以边下载边解压
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+    batch: List[str] = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_rows:
+            data = "".join(batch).encode("utf-8")
+            batch.clear()
+            yield (compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)) if compressor else data
+    data = "".join(batch).encode("utf-8")
+    if compressor is None:
+        if data:
+            yield data
+        return
+    yield compressor.compress(data) + compressor.flush(zlib.Z_FINISH)
+
+
+__all__ = ["BATCH_ROWS", "EXPORT_FORMATS", "csv_lines", "encode_chunks", "ndjson_lines", "serialize"]
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from typing import Callable, Optional
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import threading
+
+from flask import Flask, Response, g, request
+
+from .timing import PHASES, LatencyHistograms, RequestTimer, bind_timer, reset_timer, server_timing, start_timer
+
+
+# cProfile 同一时刻只能有一个实例启用（3.12 起为进程级），并发的剖析请求按普通请求处理
+_profile_lock = threading.Lock()
+
+
+def profile_response(profiler: cProfile.Profile, route: str, fmt: str) -> Response:
+    # __profile=text 返回按累计耗时排序的文本报告，其他值返回可用 pstats / snakeviz 打开的二进制 dump
+    profiler.create_stats()
+    if fmt == "text":
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(60)
+        return Response(out.getvalue(), content_type="text/plain; charset=utf-8")
+    name = route.strip("/").replace("/", "_").replace("<", "").replace(">", "") or "root"
+    response = Response(marshal.dumps(profiler.stats), content_type="application/octet-stream")  # type: ignore[attr-defined]
+    response.headers["Content-Disposition"] = f'attachment; filename="profile-{name}.prof"'
+    return response
+
+
+def instrument(app: Flask, histograms: LatencyHistograms, profiling_allowed: Callable[[], bool]) -> None:
+    """注册请求计时钩子：Server-Timing 响应头、request_timing 日志、按路由直方图，以及 ?__profile 剖析。"""
+    log = logging.getLogger(__name__)
+
+    @app.before_request
+    def _start_timer() -> None:
+        g.request_timer, g.request_timer_token = start_timer()
+        profile = request.args.get("__profile")
+        if profile and profiling_allowed() and _profile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            g.profiler, g.profile_format = profiler, profile
+            profiler.enable()
+
+    @app.after_request
+    def _finish_timer(response: Response) -> Response:
+        timer: Optional[RequestTimer] = g.pop("request_timer", None)
+        if timer is None:
+            return response
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        profiler: Optional[cProfile.Profile] = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+            response = profile_response(profiler, route, g.pop("profile_format", ""))
+        method, status = request.method, response.status_code
+
+        def finish(total: float) -> None:
+            histograms.observe(route, total, timer.phases)
+            log.info(
+                "request_timing method=%s route=%s status=%s total_ms=%.1f %s",
+                method, route, status, total * 1000,
+                " ".join(f"{name}_ms={timer.phases.get(name, 0.0) * 1000:.1f}" for name in PHASES),
+            )
+
+        total = timer.elapsed()
+        response.headers["Server-Timing"] = server_timing(timer, total)
+        if response.is_streamed:
+            # 流式响应（导出接口）的行在这之后才由生成器取出：正文迭代期间恢复计时器，直方图与日志在响应关闭时记录，
+            # 包含取行与序列化耗时；响应头先于正文发出，Server-Timing 只能反映到此为止的阶段
+            response.response = bind_timer(timer, response.response)
+            response.call_on_close(lambda: finish(timer.elapsed()))
+        else:
+            finish(total)
+        return response
+
+    @app.teardown_request
+    def _reset_timer(exc: Optional[BaseException]) -> None:
+        profiler: Optional[cProfile.Profile] = g.pop("profiler", None)
+        if profiler is not None:
+            # 视图抛异常时 after_request 不会执行，这里释放剖析器
+            profiler.disable()
+            _profile_lock.release()
+        token = g.pop("request_timer_token", None)
+        if token is not None:
+            reset_timer(token)
+
+
+__all__ = ["instrument", "profile_response"]
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, List
+import logging
+
+import psycopg
+
+from .partitions import ensure_partitions
+from .rollup import CREATE_ROLLUP_SQL, ROLLUP_TABLE, upsert_rollup_sql
+from .platforms.metrics import METRIC_COLUMN_TYPES, METRIC_COLUMNS, NULLABLE_METRICS, SORTABLE_METRICS
+
+
+# 迁移时预建的未来月份分区数；运行期由 Database 按 DB_PARTITION_MONTHS_AHEAD 继续补建
+DEFAULT_PARTITION_MONTHS_AHEAD = 3
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[psycopg.Cursor], None]
+
+
+def _sql(*statements: str) -> Callable[[psycopg.Cursor], None]:
+    def apply(cur: psycopg.Cursor) -> None:
+        for statement in statements:
+            cur.execute(statement)
+    return apply
+
+
+# 为已有数据回填指标列，表达式与旧版仪表板 SQL 保持一致
+BACKFILL_TIGA_METRICS_SQL = """
+    UPDATE activity_detail SET
+        title = activity_data->>'title',
+        collect_count = COALESCE(NULLIF(activity_data->>'collect_count','')::numeric::bigint, 0),
+        comment_count = COALESCE(NULLIF(activity_data->'total_comment'->>'count','')::numeric::bigint, 0),
+        comment_average = NULLIF(activity_data->'total_comment'->>'average','')::numeric,
+        one_week_uv = COALESCE(NULLIF(activity_data#>>'{activity_times,times,0,status,activityType,one_week_uv}','')::numeric::bigint, 0),
+        two_month_uv = COALESCE(NULLIF(activity_data#>>'{activity_times,times,0,status,activityType,two_month_uv}','')::numeric::bigint, 0),
+        history_signup_count = COALESCE(NULLIF(activity_data#>>'{activity_times,times,0,status,activityType,history_signup_count}','')::numeric::bigint, 0)
+    WHERE platform = 'tiga' AND collect_count IS NULL
+"""
+
+BACKFILL_GAIA_METRICS_SQL = """
+    UPDATE activity_detail SET
+        title = activity_data->'detail'->>'heading',
+        min_price = COALESCE(NULLIF(activity_data->'detail'->>'minPrice','')::numeric, 0),
+        max_price = COALESCE(NULLIF(activity_data->'detail'->>'maxPrice','')::numeric, 0),
+        min_size = COALESCE(NULLIF(activity_data->'detail'->>'minSize','')::numeric::bigint, 0),
+        max_size = COALESCE(NULLIF(activity_data->'detail'->>'maxSize','')::numeric::bigint, 0),
+        surplus_size = COALESCE(NULLIF(activity_data->'detail'->>'surplusSize','')::numeric::bigint, 0),
+        times_count = CASE WHEN jsonb_typeof(activity_data->'times') = 'array'
+                           THEN jsonb_array_length(activity_data->'times') ELSE 0 END
+    WHERE platform = 'gaia' AND min_price IS NULL
+"""
+
+
+def _add_metric_columns(cur: psycopg.Cursor) -> None:
+    for column in METRIC_COLUMNS:
+        cur.execute(f"ALTER TABLE activity_detail ADD COLUMN IF NOT EXISTS {column} {METRIC_COLUMN_TYPES[column]}")
+    cur.execute(BACKFILL_TIGA_METRICS_SQL)
+    cur.execute(BACKFILL_GAIA_METRICS_SQL)
+    _create_metric_indexes(cur)
+
+
+def _create_metric_indexes(cur: psycopg.Cursor) -> None:
+    # 仪表板按 (platform, date_key) 过滤后按指标排序取前 N 条，可直接走索引
+    for column in SORTABLE_METRICS:
+        order = " DESC NULLS LAST" if column in NULLABLE_METRICS else ""
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS activity_detail_{column}_idx "
+            f"ON activity_detail (platform, date_key, {column}{order})"
+        )
+
+
+def _keyset_metric_indexes(cur: psycopg.Cursor) -> None:
+    # 仪表板 keyset 翻页按 (指标, activity_id) 排序并定位，次排序键也放进索引，深页与首页代价相同
+    for column in SORTABLE_METRICS:
+        direction = " DESC NULLS LAST" if column in NULLABLE_METRICS else ""
+        id_direction = " DESC" if column in NULLABLE_METRICS else ""
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS activity_detail_{column}_seek_idx "
+            f"ON activity_detail (platform, date_key, {column}{direction}, activity_id{id_direction})"
+        )
+        cur.execute(f"DROP INDEX IF EXISTS activity_detail_{column}_idx")
+
+
+PLATFORM_DATE_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS activity_detail_platform_date_idx ON activity_detail (platform, date_key)"
+)
+PLATFORM_ACTIVITY_DATE_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS activity_detail_platform_activity_date_idx "
+    "ON activity_detail (platform, activity_id, date_key)"
+)
+
+
+def _title_search_index(cur: psycopg.Cursor) -> None:
+    # ILIKE '%q%' 只能用 pg_trgm 的 GIN 索引；没有权限创建扩展时不建索引（btree 无法用于包含匹配），标题搜索走扫描
+    try:
+        with cur.connection.transaction():
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS activity_detail_title_trgm_idx "
+                "ON activity_detail USING gin (title gin_trgm_ops)"
+            )
+    except psycopg.Error as e:
+        logging.getLogger(__name__).warning("pg_trgm_unavailable err=%s, title search is unindexed", e)
+
+
+def _is_partitioned(cur: psycopg.Cursor, table: str) -> bool:
+    cur.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = %s AND pg_table_is_visible(c.oid))",
+        (table,),
+    )
+    return bool(cur.fetchone()[0])
+
+
+def _partition_activity_detail(cur: psycopg.Cursor) -> None:
+    # date_key 由 TEXT 改为 DATE 并按月范围分区：趋势查询按日期裁剪分区，过期数据整分区 detach/drop。
+    # 分区表的主键必须包含分区键，原自增 id 列无人引用，改用 (activity_id, date_key, platform) 作主键。
+    if _is_partitioned(cur, "activity_detail"):
+        return
+    cur.execute("ALTER TABLE activity_detail RENAME TO activity_detail_legacy")
+    # 旧表的约束和索引名与新表冲突，先删除（数据拷贝不需要它们）
+    cur.execute(
+        "SELECT conname FROM pg_constraint WHERE conrelid = 'activity_detail_legacy'::regclass AND contype IN ('p', 'u')"
+    )
+    for (name,) in cur.fetchall():
+        cur.execute(f'ALTER TABLE activity_detail_legacy DROP CONSTRAINT "{name}"')
+    cur.execute(
+        "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = 'activity_detail_legacy'"
+    )
+    for (name,) in cur.fetchall():
+        cur.execute(f'DROP INDEX "{name}"')
+
+    metric_defs = ",\n".join(f"{c} {METRIC_COLUMN_TYPES[c]}" for c in METRIC_COLUMNS)
+    cur.execute(
+        f"""
+        CREATE TABLE activity_detail (
+            activity_id TEXT NOT NULL,
+            type TEXT NOT NULL,
+            date_key DATE NOT NULL,
+            platform TEXT NOT NULL,
+            activity_data JSONB NOT NULL,
+            content_hash TEXT,
+            created_at TIMESTAMP DEFAULT NOW(),
+            {metric_defs},
+            PRIMARY KEY (activity_id, date_key, platform)
+        ) PARTITION BY RANGE (date_key)
+        """
+    )
+    cur.execute("SELECT min(date_key)::date, max(date_key)::date FROM activity_detail_legacy")
+    first, last = cur.fetchone()
+    today = date.today()
+    ensure_partitions(cur, min(first or today, today), DEFAULT_PARTITION_MONTHS_AHEAD, end=max(last or today, today))
+    columns = ", ".join(("activity_id", "type", "date_key", "platform", "activity_data", "content_hash", "created_at") + METRIC_COLUMNS)
+    cur.execute(
+        f"""
+        INSERT INTO activity_detail ({columns})
+        SELECT {columns.replace("date_key", "date_key::date")} FROM activity_detail_legacy
+        """
+    )
+    cur.execute("DROP TABLE activity_detail_legacy")
+
+    # 在父表上建索引会自动建到每个分区（包括之后新建的分区）
+    _create_metric_indexes(cur)
+    cur.execute(PLATFORM_DATE_INDEX_SQL)
+    cur.execute(PLATFORM_ACTIVITY_DATE_INDEX_SQL)
+    _title_search_index(cur)
+
+    cur.execute("ALTER TABLE activity_membership ALTER COLUMN date_key TYPE DATE USING date_key::date")
+
+
+# 按版本号顺序执行；每个迁移都必须可重复执行（IF NOT EXISTS），以兼容在引入迁移前已建表的部署
+MIGRATIONS: List[Migration] = [
+    Migration(1, "create_activity_detail", _sql(
+        """
+        CREATE TABLE IF NOT EXISTS activity_detail (
+            id SERIAL PRIMARY KEY,
+            activity_id TEXT NOT NULL,
+            type TEXT NOT NULL,
+            date_key TEXT NOT NULL,
+            platform TEXT NOT NULL,
+            activity_data JSONB NOT NULL,
+            created_at TIMESTAMP DEFAULT NOW(),
+            UNIQUE(activity_id, date_key, platform)
+        )
+        """
+    )),
+    Migration(2, "add_content_hash", _sql(
+        "ALTER TABLE activity_detail ADD COLUMN IF NOT EXISTS content_hash TEXT",
+    )),
+    Migration(3, "create_activity_membership", _sql(
+        """
+        CREATE TABLE IF NOT EXISTS activity_membership (
+            activity_id TEXT NOT NULL,
+            date_key TEXT NOT NULL,
+            platform TEXT NOT NULL,
+            type TEXT NOT NULL,
+            PRIMARY KEY (platform, date_key, activity_id, type)
+        )
+        """
+    )),
+    Migration(4, "add_metric_columns", _add_metric_columns),
+    Migration(5, "index_platform_date", _sql(PLATFORM_DATE_INDEX_SQL)),
+    Migration(6, "index_platform_activity_date", _sql(PLATFORM_ACTIVITY_DATE_INDEX_SQL)),
+    Migration(7, "title_search_index", _title_search_index),
+    Migration(8, "partition_activity_detail_by_date", _partition_activity_detail),
+    Migration(9, "add_delta_storage_columns", _sql(
+        "ALTER TABLE activity_detail ADD COLUMN IF NOT EXISTS storage_kind TEXT NOT NULL DEFAULT 'full'",
+        "ALTER TABLE activity_detail ADD COLUMN IF NOT EXISTS base_date DATE",
+    )),
+    Migration(10, "create_activity_daily_rollup", _sql(
+        CREATE_ROLLUP_SQL,
+        f"CREATE INDEX IF NOT EXISTS {ROLLUP_TABLE}_activity_idx ON {ROLLUP_TABLE} (platform, activity_id, date_key)",
+        upsert_rollup_sql("activity_detail"),
+    )),
+    Migration(11, "keyset_metric_indexes", _keyset_metric_indexes),
+    Migration(12, "create_data_version", _sql(
+        """
+        CREATE TABLE IF NOT EXISTS data_version (
+            platform TEXT PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+        """,
+    )),
+    # 早期无 pg_trgm 时建的 lower(title) btree 索引匹配不了 ILIKE '%q%'，只增加写入开销
+    Migration(13, "drop_unused_title_btree_index", _sql("DROP INDEX IF EXISTS activity_detail_title_idx")),
+]
+
+# 多个进程（web、各抓取器）同时启动时只允许一个执行迁移
+_MIGRATION_LOCK_ID = 724_311_001
+
+
+def run_migrations(conn: psycopg.Connection) -> int:
+    log = logging.getLogger(__name__)
+    with conn.transaction():
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+            )
+            """
+        )
+    applied_count = 0
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        with conn.transaction():
+            conn.execute("SELECT pg_advisory_xact_lock(%s)", (_MIGRATION_LOCK_ID,))
+            done = conn.execute("SELECT 1 FROM schema_migrations WHERE version = %s", (migration.version,)).fetchone()
+            if done:
+                continue
+            log.info("db_migration_apply version=%s name=%s", migration.version, migration.name)
+            with conn.cursor() as cur:
+                migration.apply(cur)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (migration.version, migration.name),
+            )
+            applied_count += 1
+    log.info("db_migrations_done applied=%s latest=%s", applied_count, max(m.version for m in MIGRATIONS))
+    return applied_count
+
+
+__all__ = ["MIGRATIONS", "Migration", "run_migrations"]
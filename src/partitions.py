@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import List, Optional, Tuple
+import logging
+import re
+
+import psycopg
+
+
+# activity_detail 按 date_key 做月度范围分区，分区表名为 activity_detail_pYYYYMM
+PARENT_TABLE = "activity_detail"
+_PARTITION_RE = re.compile(r"^activity_detail_p(\d{4})(\d{2})$")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + (month.month - 1) + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month.year:04d}{month.month:02d}"
+
+
+def create_partition(cur: psycopg.Cursor, month: date) -> None:
+    month = month_start(month)
+    cur.execute(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def ensure_partitions(cur: psycopg.Cursor, start: date, months_ahead: int, end: Optional[date] = None) -> date:
+    # 从 start 所在月份起建到 max(end, start) 之后 months_ahead 个月，返回已覆盖的最后一个月
+    month = month_start(start)
+    last = add_months(month_start(max(end or start, start)), max(0, months_ahead))
+    while month <= last:
+        create_partition(cur, month)
+        month = add_months(month, 1)
+    return last
+
+
+def list_partitions(cur: psycopg.Cursor) -> List[Tuple[str, date]]:
+    cur.execute(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        """,
+        (PARENT_TABLE,),
+    )
+    partitions = []
+    for (name,) in cur.fetchall():
+        match = _PARTITION_RE.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def expire_partitions(cur: psycopg.Cursor, before: date, drop: bool = False) -> List[str]:
+    # 整月早于 before 的分区：detach 后改名保留（可另行归档），或直接 drop
+    log = logging.getLogger(__name__)
+    cutoff = month_start(before)
+    expired = []
+    for name, month in list_partitions(cur):
+        if month >= cutoff:
+            continue
+        cur.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+        if drop:
+            cur.execute(f"DROP TABLE {name}")
+        else:
+            # 改名避免之后按月补建分区时与已分离的表重名
+            cur.execute(f"ALTER TABLE {name} RENAME TO {name}_detached")
+        log.info("partition_expired name=%s month=%s action=%s", name, month.isoformat(), "drop" if drop else "detach")
+        expired.append(name)
+    return expired
+
+
+__all__ = [
+    "add_months",
+    "create_partition",
+    "ensure_partitions",
+    "expire_partitions",
+    "list_partitions",
+    "month_start",
+    "partition_name",
+]
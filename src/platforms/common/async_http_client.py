@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlsplit
+import logging
+
+import httpx
+
+from .base_http_client import RETRY_STATUS_FORCELIST
+from .config import BaseConfig, PlatformConfig
+from .rate_limiter import get_rate_limiter
+from .raw_json import RawPayload
+from .response_cache import CachedResponse, ResponseCache
+
+
+# BaseHttpClient 的 asyncio 版本；连接池与事件循环绑定，需在 async with 中使用
+class AsyncBaseHttpClient:
+    def __init__(self, base_config: BaseConfig, platform_config: PlatformConfig, max_connections: int = 10) -> None:
+        self._log = logging.getLogger(__name__)
+        self._base_config = base_config
+        self._platform_config = platform_config
+        self._max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+        self._limiter = get_rate_limiter(base_config, RETRY_STATUS_FORCELIST)
+        self._cache = ResponseCache.from_config(base_config)
+
+    async def __aenter__(self) -> "AsyncBaseHttpClient":
+        limits = httpx.Limits(max_connections=self._max_connections, max_keepalive_connections=self._max_connections)
+        self._client = httpx.AsyncClient(limits=limits, timeout=self._base_config.timeout_seconds)
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+
+    async def _apply_delay(self, host: str) -> None:
+        if self._limiter is None:
+            return
+        # 限速状态可能放在带 flock 的共享文件里，读改写放到线程中，事件循环里只做等待
+        wait = await asyncio.to_thread(self._limiter.reserve, host)
+        if wait > 0:
+            rate = await asyncio.to_thread(self._limiter.current_rate, host)
+            self._log.info("http_delay seconds=%s rate=%.3f", round(wait, 3), rate)
+            await asyncio.sleep(wait)
+
+    def _get_base_url(self) -> str:
+        return self._platform_config.base_url.rstrip("/")
+
+    def _get_default_headers(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {
+            "Connection": "keep-alive",
+        }
+        if self._platform_config.user_agent:
+            headers["User-Agent"] = self._platform_config.user_agent
+        if self._platform_config.accept_language:
+            headers["Accept-Language"] = self._platform_config.accept_language
+        return headers
+
+    async def _send(self, method: str, url: str, host: str, data: Optional[Dict[str, Any]], params: Optional[Dict[str, Any]],
+                    headers: Dict[str, str]) -> httpx.Response:
+        assert self._client is not None, "AsyncBaseHttpClient must be used inside 'async with'"
+        # 与同步客户端的 urllib3 Retry 保持一致：对限流/5xx 和连接错误做指数退避重试
+        attempt = 0
+        while True:
+            try:
+                if method == "POST":
+                    response = await self._client.post(url, data=data, headers=headers)
+                else:
+                    response = await self._client.get(url, params=params, headers=headers)
+                if self._limiter is not None:
+                    await asyncio.to_thread(self._limiter.record, host, response.status_code)
+                if response.status_code not in RETRY_STATUS_FORCELIST or attempt >= self._base_config.retry_total:
+                    return response
+            except httpx.TransportError:
+                if attempt >= self._base_config.retry_total:
+                    raise
+            attempt += 1
+            backoff = self._base_config.retry_backoff * (2 ** (attempt - 1))
+            self._log.warning("http_retry attempt=%s sleep=%ss url=%s", attempt, backoff, url)
+            await asyncio.sleep(backoff)
+
+    def _is_cacheable(self, payload: Mapping[str, Any]) -> bool:
+        return True
+
+    async def request(self, method: str, path: str, data: Optional[Dict[str, Any]] = None,
+                      params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> RawPayload:
+        url = self._get_base_url() + path
+        merged_headers = self._get_default_headers()
+        if headers:
+            merged_headers.update(headers)
+
+        method = method.upper()
+        if method not in ("GET", "POST"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+
+        cache_key: Optional[str] = None
+        cached: Optional[CachedResponse] = None
+        ttl = self._cache.ttl_for(url) if self._cache else None
+        if self._cache is not None and ttl is not None:
+            cache_key = ResponseCache.make_key(method, url, data or params)
+            # 磁盘缓存的读写与 LRU 维护都是同步 IO，放到线程中执行
+            cached = await asyncio.to_thread(self._cache.get, cache_key)
+            if cached is not None and cached.is_fresh(ttl):
+                self._log.info("http_cache_hit url=%s", url)
+                return RawPayload(cached.body)
+            if cached is not None:
+                merged_headers.update(cached.conditional_headers())
+
+        host = urlsplit(url).netloc
+        self._log.info("http_request method=%s url=%s", method, url)
+        await self._apply_delay(host)
+        response = await self._send(method, url, host, data, params, merged_headers)
+
+        self._log.info("http_response status=%s url=%s", response.status_code, url)
+        if response.status_code == 304 and cached is not None:
+            self._log.info("http_cache_revalidated url=%s", url)
+            await asyncio.to_thread(self._cache.touch, cached)
+            return RawPayload(cached.body)
+        response.raise_for_status()
+        # 不在这里整体解析：调用方按需取字段，data 原文可直接入库
+        payload = RawPayload(response.content)
+        if cache_key is not None and self._is_cacheable(payload) and (
+                ttl or response.headers.get("ETag") or response.headers.get("Last-Modified")):
+            await asyncio.to_thread(
+                self._cache.put, cache_key, response.content, response.headers.get("ETag"), response.headers.get("Last-Modified")
+            )
+        return payload
+
+
+__all__ = ["AsyncBaseHttpClient"]
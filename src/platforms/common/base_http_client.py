@@ -1,41 +1,64 @@
 from __future__ import annotations
 
-import time
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Mapping, Optional
+from urllib.parse import urlsplit
 import logging
-import random
 
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 from .config import BaseConfig, PlatformConfig
+from .rate_limiter import get_rate_limiter
+from .raw_json import RawPayload
+from .response_cache import CachedResponse, ResponseCache
+
+
+RETRY_STATUS_FORCELIST = [429, 500, 502, 503, 504]
 
 
 class BaseHttpClient:
-    def __init__(self, base_config: BaseConfig, platform_config: PlatformConfig) -> None:
+    def __init__(self, base_config: BaseConfig, platform_config: PlatformConfig, pool_size: Optional[int] = None) -> None:
         self._log = logging.getLogger(__name__)
         self._base_config = base_config
         self._platform_config = platform_config
         self._session = requests.Session()
+        # 进程内共享的按 host 限速器，未配置 RATE_LIMIT_RPS / DELAY_* 时不限速
+        self._limiter = get_rate_limiter(base_config, RETRY_STATUS_FORCELIST)
+        self._cache = ResponseCache.from_config(base_config)
 
         retry = Retry(
             total=base_config.retry_total,
             backoff_factor=base_config.retry_backoff,
-            status_forcelist=[429, 500, 502, 503, 504],
+            status_forcelist=RETRY_STATUS_FORCELIST,
             allowed_methods=["HEAD", "GET", "POST", "PUT", "DELETE", "OPTIONS", "TRACE"],
             raise_on_status=False,
         )
-        adapter = HTTPAdapter(max_retries=retry)
+        if pool_size:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        else:
+            adapter = HTTPAdapter(max_retries=retry)
         self._session.mount("http://", adapter)
         self._session.mount("https://", adapter)
 
-    def _apply_delay(self) -> None:
-        if self._base_config.delay_min_seconds is not None and self._base_config.delay_max_seconds is not None:
-            delay = random.uniform(self._base_config.delay_min_seconds, self._base_config.delay_max_seconds)
-            if delay > 0:
-                self._log.info("http_delay seconds=%s", round(delay, 3))
-                time.sleep(delay)
+    def _apply_delay(self, host: str) -> None:
+        if self._limiter is None:
+            return
+        wait = self._limiter.acquire(host)
+        if wait > 0:
+            self._log.info("http_delay seconds=%s rate=%.3f", round(wait, 3), self._limiter.current_rate(host))
+
+    def _record_statuses(self, host: str, response: requests.Response) -> None:
+        if self._limiter is None:
+            return
+        # urllib3 内部重试过的 429/5xx 也要反馈给限速器
+        statuses: List[int] = []
+        retries = getattr(response.raw, "retries", None)
+        if retries is not None:
+            statuses.extend(h.status for h in retries.history if h.status is not None)
+        statuses.append(response.status_code)
+        for status in statuses:
+            self._limiter.record(host, status)
 
     def _get_base_url(self) -> str:
         return self._platform_config.base_url.rstrip("/")
@@ -50,15 +73,33 @@ class BaseHttpClient:
             headers["Accept-Language"] = self._platform_config.accept_language
         return headers
 
+    def _is_cacheable(self, payload: Mapping[str, Any]) -> bool:
+        # 子类按业务返回码判断，避免缓存错误响应
+        return True
+
     def request(self, method: str, path: str, data: Optional[Dict[str, Any]] = None, 
-                params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+                params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> RawPayload:
         url = self._get_base_url() + path
         merged_headers = self._get_default_headers()
         if headers:
             merged_headers.update(headers)
 
+        cache_key: Optional[str] = None
+        cached: Optional[CachedResponse] = None
+        ttl = self._cache.ttl_for(url) if self._cache else None
+        if self._cache is not None and ttl is not None:
+            cache_key = ResponseCache.make_key(method, url, data or params)
+            cached = self._cache.get(cache_key)
+            if cached is not None and cached.is_fresh(ttl):
+                # 命中直接返回，不发请求也不占用限速令牌
+                self._log.info("http_cache_hit url=%s", url)
+                return RawPayload(cached.body)
+            if cached is not None:
+                merged_headers.update(cached.conditional_headers())
+
+        host = urlsplit(url).netloc
         self._log.info("http_request method=%s url=%s", method, url)
-        self._apply_delay()
+        self._apply_delay(host)
 
         if method.upper() == "POST":
             response = self._session.post(url, data=data, headers=merged_headers, timeout=self._base_config.timeout_seconds)
@@ -68,8 +109,18 @@ class BaseHttpClient:
             raise ValueError(f"Unsupported HTTP method: {method}")
 
         self._log.info("http_response status=%s url=%s", response.status_code, url)
+        self._record_statuses(host, response)
+        if response.status_code == 304 and cached is not None:
+            self._log.info("http_cache_revalidated url=%s", url)
+            self._cache.touch(cached)
+            return RawPayload(cached.body)
         response.raise_for_status()
-        return response.json()
+        # 不在这里整体解析：调用方按需取字段，data 原文可直接入库
+        payload = RawPayload(response.content)
+        if cache_key is not None and self._is_cacheable(payload) and (
+                ttl or response.headers.get("ETag") or response.headers.get("Last-Modified")):
+            self._cache.put(cache_key, response.content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return payload
 
 
-__all__ = ["BaseHttpClient"]
\ No newline at end of file
+__all__ = ["BaseHttpClient", "RETRY_STATUS_FORCELIST"]
\ No newline at end of file
@@ -1,17 +1,21 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import Iterable, Iterator, Optional, Tuple
 import logging
 from datetime import date
 
-from ...db import Database
+from ...db import WriteStats
+from ...storage.base import ActivityStore
+from .dedup import SeenSet
+from .raw_json import ActivityData
 
 
 class BaseScraper(ABC):
-    def __init__(self, db: Database) -> None:
+    def __init__(self, db: ActivityStore) -> None:
         self._log = logging.getLogger(__name__)
         self._db = db
+        self._seen = SeenSet()
 
     @abstractmethod
     def get_platform_name(self) -> str:
@@ -21,7 +25,42 @@ class BaseScraper(ABC):
     def scrape_activities(self, max_pages: Optional[int] = None) -> None:
         pass
 
-    def save_activity_data(self, activity_id: str, date_key: str, activity_data: Dict[str, Any], type_text: str) -> None:
+    def run(self, max_pages: Optional[int] = None, seen: Optional[SeenSet] = None) -> WriteStats:
+        # 默认每轮重新去重；分片抓取传入跨分类共享的集合
+        self._seen = seen if seen is not None else SeenSet()
+        # 一轮抓取结束（包括异常退出）时把缓冲中的数据写入数据库
+        try:
+            self.scrape_activities(max_pages=max_pages)
+        finally:
+            self._db.flush()
+            # 数据已落库（异常退出时是部分数据）：递增数据版本，Web 端缓存的查询结果随之失效
+            self._db.bump_data_version(self.get_platform_name())
+        stats = self._db.take_write_stats(self.get_platform_name())
+        self._log.info(
+            "tick_write_stats platform=%s inserted=%s changed=%s unchanged=%s unique=%s duplicates=%s",
+            self.get_platform_name(), stats.inserted, stats.changed, stats.unchanged,
+            len(self._seen), self._seen.duplicates,
+        )
+        return stats
+
+    def claim_activity(self, activity_id: str, type_text: str) -> bool:
+        # 每次出现都记录所属分类/类型，但同一轮内只有第一次出现需要抓取详情
+        self._db.save_membership(
+            activity_id=str(activity_id),
+            date_key=date.today().isoformat(),
+            type_text=type_text,
+            platform=self.get_platform_name(),
+        )
+        return self._seen.add(str(activity_id))
+
+    def dedup_items(self, items: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+        for activity_id, type_text in items:
+            if self.claim_activity(activity_id, type_text):
+                yield activity_id, type_text
+            else:
+                self._log.debug("duplicate_skipped activity_id=%s type=%s", activity_id, type_text)
+
+    def save_activity_data(self, activity_id: str, date_key: str, activity_data: ActivityData, type_text: str) -> None:
         self._db.save_activity_detail(
             activity_id=str(activity_id),
             date_key=date_key,
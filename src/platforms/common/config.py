@@ -17,6 +17,32 @@ class BaseConfig:
     secret_key: str
     tiga_display_name: str
     gaia_display_name: str
+    rate_limit_rps: Optional[float] = None
+    rate_limit_burst: float = 1.0
+    rate_limit_min_rps: Optional[float] = None
+    rate_limit_max_rps: Optional[float] = None
+    rate_limit_increase: float = 0.05
+    rate_limit_decrease: float = 0.5
+    rate_limit_state_file: Optional[str] = None
+    db_batch_size: int = 100
+    db_flush_interval_seconds: float = 5.0
+    db_partition_months_ahead: int = 3
+    retention_months: int = 0
+    db_storage_mode: str = "full"
+    db_delta_max_ratio: float = 0.5
+    archive_dir: Optional[str] = None
+    http_cache_dir: Optional[str] = None
+    http_cache_max_mb: float = 512.0
+    http_cache_ttls: str = ""
+    web_db_pool_min: int = 1
+    web_db_pool_max: int = 10
+    web_db_pool_timeout: float = 10.0
+    web_cache_ttl_seconds: float = 300.0
+    web_cache_stale_seconds: float = 30.0
+    web_cache_max_entries: int = 256
+    web_cache_version_check_seconds: float = 2.0
+    web_profiling: bool = False
+    web_metrics_token: Optional[str] = None
 
     @classmethod
     def from_env(cls) -> "BaseConfig":
@@ -33,6 +59,32 @@ class BaseConfig:
             secret_key=os.getenv("SECRET_KEY", "please-change-me"),
             tiga_display_name=os.getenv("TIGA_DISPLAY_NAME", "Tiga"),
             gaia_display_name=os.getenv("GAIA_DISPLAY_NAME", "Gaia"),
+            rate_limit_rps=(float(os.getenv("RATE_LIMIT_RPS")) if os.getenv("RATE_LIMIT_RPS") else None),
+            rate_limit_burst=float(os.getenv("RATE_LIMIT_BURST", "1")),
+            rate_limit_min_rps=(float(os.getenv("RATE_LIMIT_MIN_RPS")) if os.getenv("RATE_LIMIT_MIN_RPS") else None),
+            rate_limit_max_rps=(float(os.getenv("RATE_LIMIT_MAX_RPS")) if os.getenv("RATE_LIMIT_MAX_RPS") else None),
+            rate_limit_increase=float(os.getenv("RATE_LIMIT_INCREASE", "0.05")),
+            rate_limit_decrease=float(os.getenv("RATE_LIMIT_DECREASE", "0.5")),
+            rate_limit_state_file=os.getenv("RATE_LIMIT_STATE_FILE") or None,
+            db_batch_size=int(os.getenv("DB_BATCH_SIZE", "100")),
+            db_flush_interval_seconds=float(os.getenv("DB_FLUSH_INTERVAL_SECONDS", "5")),
+            db_partition_months_ahead=int(os.getenv("DB_PARTITION_MONTHS_AHEAD", "3")),
+            retention_months=int(os.getenv("RETENTION_MONTHS", "0")),
+            db_storage_mode=os.getenv("DB_STORAGE_MODE", "full").strip().lower(),
+            db_delta_max_ratio=float(os.getenv("DB_DELTA_MAX_RATIO", "0.5")),
+            archive_dir=os.getenv("ARCHIVE_DIR") or None,
+            http_cache_dir=os.getenv("HTTP_CACHE_DIR") or None,
+            http_cache_max_mb=float(os.getenv("HTTP_CACHE_MAX_MB", "512")),
+            http_cache_ttls=os.getenv("HTTP_CACHE_TTLS", "/sku/detail=0,/trip-wide=0,/api/v1/activity/detail=0"),
+            web_db_pool_min=int(os.getenv("WEB_DB_POOL_MIN", "1")),
+            web_db_pool_max=int(os.getenv("WEB_DB_POOL_MAX", "10")),
+            web_db_pool_timeout=float(os.getenv("WEB_DB_POOL_TIMEOUT", "10")),
+            web_cache_ttl_seconds=float(os.getenv("WEB_CACHE_TTL_SECONDS", "300")),
+            web_cache_stale_seconds=float(os.getenv("WEB_CACHE_STALE_SECONDS", "30")),
+            web_cache_max_entries=int(os.getenv("WEB_CACHE_MAX_ENTRIES", "256")),
+            web_cache_version_check_seconds=float(os.getenv("WEB_CACHE_VERSION_CHECK_SECONDS", "2")),
+            web_profiling=os.getenv("WEB_PROFILING", "").strip().lower() in ("1", "true", "yes"),
+            web_metrics_token=os.getenv("WEB_METRICS_TOKEN") or None,
         )
 
 
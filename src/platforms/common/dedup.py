@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from typing import MutableMapping, Set
+
+
+# 本轮已抓取的活动 ID 集合；只保存 8 字节摘要，几十万条也只占用几十 MB 以内，
+# 且与布隆过滤器不同不会因误判而漏抓（64 位摘要的碰撞概率可忽略）
+class SeenSet:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._digests: Set[bytes] = set()
+        self.duplicates = 0
+
+    @staticmethod
+    def _digest(key: str) -> bytes:
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+
+    def add(self, key: str) -> bool:
+        digest = self._digest(key)
+        with self._lock:
+            if digest in self._digests:
+                self.duplicates += 1
+                return False
+            self._digests.add(digest)
+            return True
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+
+class SharedSeenSet(SeenSet):
+    # 跨进程共享：摘要同时登记到 multiprocessing.Manager 的 dict 中，分片抓取时同一活动出现在
+    # 多个分类（分给不同子进程）也只抓一次；本进程内已见过的摘要不再走 IPC
+    def __init__(self, shared: MutableMapping[bytes, int]) -> None:
+        super().__init__()
+        self._shared = shared
+        self._token = os.getpid()
+
+    def add(self, key: str) -> bool:
+        digest = self._digest(key)
+        with self._lock:
+            # setdefault 在 Manager 进程内原子执行，返回值是最先登记者的 pid
+            if digest in self._digests or self._shared.setdefault(digest, self._token) != self._token:
+                self.duplicates += 1
+                return False
+            self._digests.add(digest)
+            return True
+
+
+__all__ = ["SeenSet", "SharedSeenSet"]
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from decimal import Decimal, InvalidOperation
+from typing import Any, Optional
+
+
+def to_decimal(value: Any) -> Optional[Decimal]:
+    # 与 SQL 中 NULLIF(x, '')::numeric 的语义一致：空值/空串为 NULL
+    if value is None or value == "" or isinstance(value, bool):
+        return None
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        return None
+
+
+def to_int(value: Any) -> Optional[int]:
+    number = to_decimal(value)
+    return int(number.to_integral_value()) if number is not None and number.is_finite() else None
+
+
+def dig(data: Any, *path: Any) -> Any:
+    cur = data
+    for key in path:
+        if isinstance(cur, list) and isinstance(key, int):
+            cur = cur[key] if -len(cur) <= key < len(cur) else None
+        elif isinstance(cur, dict):
+            cur = cur.get(key)
+        else:
+            return None
+    return cur
+
+
+__all__ = ["dig", "to_decimal", "to_int"]
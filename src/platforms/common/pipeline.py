@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+import logging
+
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+    queue_size: int = 100
+
+
+@dataclass
+class StageStats:
+    name: str
+    workers: int
+    processed: int = 0
+    failed: int = 0
+    dropped: int = 0
+    busy_seconds: float = 0.0
+    queue_depth: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, elapsed: float, ok: bool, dropped: bool) -> None:
+        with self._lock:
+            self.busy_seconds += elapsed
+            if not ok:
+                self.failed += 1
+            elif dropped:
+                self.dropped += 1
+            else:
+                self.processed += 1
+
+    def throughput(self, wall_seconds: float) -> float:
+        return self.processed / wall_seconds if wall_seconds > 0 else 0.0
+
+
+# 列表 → 详情 → 落库 的分段流水线：各段独立线程，段间用有界队列实现背压。
+# 每个阶段的函数返回 None 表示丢弃该条，不再传给下一阶段；单条异常只记录不终止。
+class Pipeline:
+    def __init__(self, name: str, sources: List[Tuple[str, Callable[[], Iterable[Any]]]],
+                 stages: List[Stage], stats_interval_seconds: float = 30.0) -> None:
+        if not stages:
+            raise ValueError("pipeline needs at least one stage")
+        self._log = logging.getLogger(__name__)
+        self.name = name
+        self._sources = sources
+        self._stages = stages
+        self._stats_interval = stats_interval_seconds
+        self._queues: List[queue.Queue] = [queue.Queue(maxsize=max(1, s.queue_size)) for s in stages]
+        self.stats: Dict[str, StageStats] = {s.name: StageStats(s.name, max(1, s.workers)) for s in stages}
+        self.source_items: Dict[str, int] = {name: 0 for name, _ in sources}
+        self._source_errors: List[BaseException] = []
+        self._started = 0.0
+
+    def _run_source(self, name: str, produce: Callable[[], Iterable[Any]]) -> None:
+        try:
+            for item in produce():
+                self._queues[0].put(item)
+                self.source_items[name] += 1
+        except Exception as e:
+            self._log.error("pipeline_source_failed pipeline=%s source=%s err=%s", self.name, name, e)
+            self._source_errors.append(e)
+
+    def _run_worker(self, index: int) -> None:
+        stage = self._stages[index]
+        stats = self.stats[stage.name]
+        inbox = self._queues[index]
+        outbox = self._queues[index + 1] if index + 1 < len(self._queues) else None
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                return
+            started = time.monotonic()
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                stats.record(time.monotonic() - started, ok=False, dropped=False)
+                self._log.error("pipeline_item_failed pipeline=%s stage=%s item=%s err=%s", self.name, stage.name, item, e)
+                continue
+            # 最后一段（落库）没有下游，返回值不计为丢弃
+            stats.record(time.monotonic() - started, ok=True, dropped=result is None and outbox is not None)
+            if result is not None and outbox is not None:
+                outbox.put(result)
+
+    def snapshot(self) -> Dict[str, StageStats]:
+        for stage, q in zip(self._stages, self._queues):
+            self.stats[stage.name].queue_depth = q.qsize()
+        return self.stats
+
+    def log_stats(self, final: bool = False) -> None:
+        wall = time.monotonic() - self._started
+        for st in self.snapshot().values():
+            self._log.info(
+                "pipeline_stats pipeline=%s stage=%s workers=%s processed=%s dropped=%s failed=%s queue=%s rate=%.2f/s busy=%.1fs final=%s",
+                self.name, st.name, st.workers, st.processed, st.dropped, st.failed, st.queue_depth,
+                st.throughput(wall), st.busy_seconds, final,
+            )
+
+    def _monitor(self, stop: threading.Event) -> None:
+        while not stop.wait(self._stats_interval):
+            self.log_stats()
+
+    def run(self) -> Dict[str, StageStats]:
+        self._started = time.monotonic()
+        stop = threading.Event()
+        monitor = threading.Thread(target=self._monitor, args=(stop,), name=f"{self.name}-stats", daemon=True)
+        monitor.start()
+
+        sources = [
+            threading.Thread(target=self._run_source, args=(name, produce), name=f"{self.name}-{name}")
+            for name, produce in self._sources
+        ]
+        workers: List[List[threading.Thread]] = [
+            [
+                threading.Thread(target=self._run_worker, args=(i,), name=f"{self.name}-{stage.name}-{n}")
+                for n in range(max(1, stage.workers))
+            ]
+            for i, stage in enumerate(self._stages)
+        ]
+        for t in sources:
+            t.start()
+        for group in workers:
+            for t in group:
+                t.start()
+
+        # 上游全部结束后逐段下发结束标记，保证队列中的数据都被处理完
+        for t in sources:
+            t.join()
+        for q, group in zip(self._queues, workers):
+            for _ in group:
+                q.put(_DONE)
+            for t in group:
+                t.join()
+
+        stop.set()
+        self.log_stats(final=True)
+        if self._source_errors:
+            raise self._source_errors[0]
+        return self.stats
+
+
+__all__ = ["Pipeline", "Stage", "StageStats"]
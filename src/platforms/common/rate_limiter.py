@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+import logging
+
+from .config import BaseConfig
+
+
+State = Dict[str, Dict[str, float]]
+
+
+class _MemoryStore:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._state: State = {}
+
+    @contextmanager
+    def locked(self) -> Iterator[State]:
+        with self._lock:
+            yield self._state
+
+
+class _FileStore:
+    # 多进程共享：每次读改写都持有文件排他锁
+    def __init__(self, path: str) -> None:
+        import fcntl
+
+        self._fcntl = fcntl
+        self._path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    @contextmanager
+    def locked(self) -> Iterator[State]:
+        with self._lock, open(self._path, "a+", encoding="utf-8") as f:
+            self._fcntl.flock(f, self._fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                try:
+                    state: State = json.loads(raw) if raw else {}
+                except ValueError:
+                    state = {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+                f.flush()
+            finally:
+                self._fcntl.flock(f, self._fcntl.LOCK_UN)
+
+
+# 按 host 的令牌桶限速；遇到限流/5xx 时乘性降速，成功请求再加性恢复（AIMD）
+class RateLimiter:
+    def __init__(self, rate: float, burst: float = 1.0, min_rate: Optional[float] = None,
+                 max_rate: Optional[float] = None, increase: float = 0.05, decrease: float = 0.5,
+                 throttle_statuses: Iterable[int] = (429, 500, 502, 503, 504),
+                 state_file: Optional[str] = None) -> None:
+        self._log = logging.getLogger(__name__)
+        self.initial_rate = rate
+        self.burst = max(1.0, burst)
+        self.min_rate = min_rate if min_rate is not None else rate / 10
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.increase = increase
+        self.decrease = decrease
+        self.throttle_statuses = frozenset(throttle_statuses)
+        self.state_file = state_file
+        self._store = _FileStore(state_file) if state_file else _MemoryStore()
+
+    @classmethod
+    def from_config(cls, base_config: BaseConfig, throttle_statuses: Iterable[int]) -> Optional["RateLimiter"]:
+        rate = base_config.rate_limit_rps
+        if rate is None and base_config.delay_min_seconds is not None and base_config.delay_max_seconds is not None:
+            # 兼容旧配置：以随机延时的均值换算速率
+            mean_delay = (base_config.delay_min_seconds + base_config.delay_max_seconds) / 2
+            rate = 1 / mean_delay if mean_delay > 0 else None
+        if not rate:
+            return None
+        return cls(
+            rate=rate,
+            burst=base_config.rate_limit_burst,
+            min_rate=base_config.rate_limit_min_rps,
+            max_rate=base_config.rate_limit_max_rps,
+            increase=base_config.rate_limit_increase,
+            decrease=base_config.rate_limit_decrease,
+            throttle_statuses=throttle_statuses,
+            state_file=base_config.rate_limit_state_file,
+        )
+
+    def _bucket(self, state: State, host: str, now: float) -> Dict[str, float]:
+        bucket = state.get(host)
+        if bucket is None:
+            bucket = {"tokens": self.burst, "last": now, "rate": self.initial_rate}
+            state[host] = bucket
+        elapsed = max(0.0, now - bucket["last"])
+        bucket["tokens"] = min(self.burst, bucket["tokens"] + elapsed * bucket["rate"])
+        bucket["last"] = now
+        return bucket
+
+    def reserve(self, host: str) -> float:
+        # 预占一个令牌并返回需要等待的秒数；令牌可以为负，表示已排队的请求
+        with self._store.locked() as state:
+            bucket = self._bucket(state, host, time.time())
+            bucket["tokens"] -= 1
+            if bucket["tokens"] >= 0:
+                return 0.0
+            return -bucket["tokens"] / bucket["rate"]
+
+    def acquire(self, host: str) -> float:
+        wait = self.reserve(host)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def _adjust(self, host: str, throttled: bool, status: int) -> None:
+        with self._store.locked() as state:
+            bucket = self._bucket(state, host, time.time())
+            old = bucket["rate"]
+            if throttled:
+                new = max(self.min_rate, old * self.decrease)
+            else:
+                new = min(self.max_rate, old + self.increase)
+            bucket["rate"] = new
+        if throttled and new != old:
+            self._log.warning("rate_limit_decrease host=%s status=%s rate=%.3f->%.3f", host, status, old, new)
+        elif not throttled and old < self.max_rate <= new:
+            self._log.info("rate_limit_recovered host=%s rate=%.3f", host, new)
+
+    def record(self, host: str, status: int) -> None:
+        self._adjust(host, status in self.throttle_statuses, status)
+
+    def current_rate(self, host: str) -> float:
+        with self._store.locked() as state:
+            bucket = state.get(host)
+            return bucket["rate"] if bucket else self.initial_rate
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._store.locked() as state:
+            return {host: dict(bucket) for host, bucket in state.items()}
+
+
+_shared: Dict[Tuple, RateLimiter] = {}
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter(base_config: BaseConfig, throttle_statuses: Iterable[int]) -> Optional[RateLimiter]:
+    # 同一进程内的所有客户端共用一个限速器，按 host 分桶
+    key = (
+        base_config.rate_limit_rps, base_config.rate_limit_burst, base_config.rate_limit_min_rps,
+        base_config.rate_limit_max_rps, base_config.rate_limit_increase, base_config.rate_limit_decrease,
+        base_config.rate_limit_state_file, base_config.delay_min_seconds, base_config.delay_max_seconds,
+        tuple(throttle_statuses),
+    )
+    with _shared_lock:
+        if key not in _shared:
+            limiter = RateLimiter.from_config(base_config, throttle_statuses)
+            if limiter is None:
+                return None
+            _shared[key] = limiter
+        return _shared[key]
+
+
+__all__ = ["RateLimiter", "get_rate_limiter"]
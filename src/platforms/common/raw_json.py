@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Mapping, Optional, Union
+import json
+import re
+
+
+_DECODER = json.JSONDecoder()
+_WS = re.compile(r"[ \t\n\r]*")
+
+
+@dataclass(frozen=True)
+class RawJson:
+    # 上游响应中某个 JSON 值的原文与解析结果：入库直接用 text，指标提取用 value
+    text: str
+    value: Any
+
+    @classmethod
+    def of(cls, value: Any) -> RawJson:
+        # 与 dict 入库时的序列化一致（按键排序），同一文档经两条路径写入时哈希相同
+        return cls(json.dumps(value, ensure_ascii=False, sort_keys=True), value)
+
+    @classmethod
+    def compose(cls, fields: Mapping[str, RawJson]) -> RawJson:
+        # 用各字段原文拼出一个 JSON 对象，不重新序列化字段内容
+        text = "{" + ",".join(
+            json.dumps(key, ensure_ascii=False) + ":" + raw.text for key, raw in fields.items()
+        ) + "}"
+        return cls(text, {key: raw.value for key, raw in fields.items()})
+
+
+# 写入接口接受的 activity_data：解析后的 dict，或带原文的 RawJson
+ActivityData = Union[Dict[str, Any], RawJson]
+
+
+class RawPayload(Mapping[str, Any]):
+    """上游 JSON 对象响应的惰性视图。
+
+    顶层键按顺序逐个扫描，读到所需键即停止，每个值同时记下其在原文中的区间；
+    通过 raw() 取出的值可原样写库，省去 json.loads + json.dumps 的往返。
+    """
+
+    def __init__(self, body: Union[bytes, str]) -> None:
+        self._text = body.decode("utf-8") if isinstance(body, (bytes, bytearray)) else body
+        self._fields: Dict[str, RawJson] = {}
+        self._pos: Optional[int] = None
+        self._done = False
+
+    def _expect(self, pos: int, char: str) -> int:
+        if self._text[pos:pos + 1] != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self._text, pos)
+        return _WS.match(self._text, pos + 1).end()
+
+    def _scan_next(self) -> bool:
+        text = self._text
+        if self._done:
+            return False
+        if self._pos is None:
+            pos = self._expect(_WS.match(text, 0).end(), "{")
+            if text[pos:pos + 1] == "}":
+                self._done = True
+                return False
+            self._pos = pos
+        key, pos = _DECODER.raw_decode(text, self._pos)
+        if not isinstance(key, str):
+            raise json.JSONDecodeError("Expecting property name", text, self._pos)
+        pos = self._expect(_WS.match(text, pos).end(), ":")
+        value, end = _DECODER.raw_decode(text, pos)
+        self._fields[key] = RawJson(text[pos:end], value)
+        pos = _WS.match(text, end).end()
+        if text[pos:pos + 1] == "}":
+            self._done = True
+        else:
+            self._pos = self._expect(pos, ",")
+        return True
+
+    def raw(self, key: str) -> Optional[RawJson]:
+        while key not in self._fields and self._scan_next():
+            pass
+        return self._fields.get(key)
+
+    def __getitem__(self, key: str) -> Any:
+        raw = self.raw(key)
+        if raw is None:
+            raise KeyError(key)
+        return raw.value
+
+    def __iter__(self) -> Iterator[str]:
+        while self._scan_next():
+            pass
+        return iter(list(self._fields))
+
+    def __len__(self) -> int:
+        while self._scan_next():
+            pass
+        return len(self._fields)
+
+
+def raw_field(resp: Mapping[str, Any], key: str, default: Any = None) -> RawJson:
+    # 兼容普通 dict（测试或旧调用方），缺键时退回 default
+    if isinstance(resp, RawPayload):
+        raw = resp.raw(key)
+        return raw if raw is not None else RawJson.of(default)
+    return RawJson.of(resp.get(key, default))
+
+
+__all__ = ["ActivityData", "RawJson", "RawPayload", "raw_field"]
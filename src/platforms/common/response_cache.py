@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+import logging
+
+from .config import BaseConfig
+
+
+@dataclass
+class CachedResponse:
+    key: str
+    body: bytes
+    stored_at: float
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+    def is_fresh(self, ttl: float) -> bool:
+        return ttl > 0 and time.time() - self.stored_at < ttl
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+# 磁盘响应缓存：每个 key 一个文件（首行元数据 JSON，其余为响应体），
+# 以文件 mtime 作为最近使用时间，总大小超限时按 LRU 淘汰
+class ResponseCache:
+    def __init__(self, directory: str, max_bytes: int, ttls: List[Tuple[str, float]]) -> None:
+        self._log = logging.getLogger(__name__)
+        self._dir = directory
+        self._max_bytes = max_bytes
+        # 长前缀优先匹配
+        self._ttls = sorted(ttls, key=lambda t: len(t[0]), reverse=True)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+    @classmethod
+    def from_config(cls, base_config: BaseConfig) -> Optional["ResponseCache"]:
+        if not base_config.http_cache_dir:
+            return None
+        ttls: List[Tuple[str, float]] = []
+        for part in base_config.http_cache_ttls.split(","):
+            if "=" in part:
+                prefix, ttl = part.split("=", 1)
+                ttls.append((prefix.strip(), float(ttl)))
+        return cls(base_config.http_cache_dir, int(base_config.http_cache_max_mb * 1024 * 1024), ttls)
+
+    def ttl_for(self, url: str) -> Optional[float]:
+        path = urlsplit(url).path
+        for prefix, ttl in self._ttls:
+            if path.startswith(prefix):
+                return ttl
+        return None
+
+    @staticmethod
+    def make_key(method: str, url: str, body: Optional[Mapping[str, Any]] = None) -> str:
+        raw = method.upper() + " " + url
+        if body:
+            raw += "\n" + urlencode(sorted((str(k), str(v)) for k, v in body.items()))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._dir, key)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return CachedResponse(key, body, meta["stored_at"], meta.get("etag"), meta.get("last_modified"))
+
+    def put(self, key: str, body: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        meta = json.dumps({"stored_at": time.time(), "etag": etag, "last_modified": last_modified}).encode("utf-8")
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            try:
+                old_size = os.path.getsize(path)
+            except OSError:
+                old_size = 0
+            with open(tmp, "wb") as f:
+                f.write(meta + b"\n")
+                f.write(body)
+            os.replace(tmp, path)
+            self._size += len(meta) + 1 + len(body) - old_size
+            if self._size > self._max_bytes:
+                self._evict()
+
+    def touch(self, entry: CachedResponse) -> None:
+        # 304 时只刷新存储时间，响应体沿用
+        self.put(entry.key, entry.body, entry.etag, entry.last_modified)
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in os.scandir(self._dir):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+        target = int(self._max_bytes * 0.9)
+        removed = 0
+        for _, size, path in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+            removed += 1
+        self._log.info("http_cache_evict removed=%s size_bytes=%s", removed, self._size)
+
+
+__all__ = ["CachedResponse", "ResponseCache"]
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, List, Mapping, Optional, Set
+import logging
+from datetime import date
+
+from ...storage.base import ActivityStore
+from ..common.base_scraper import BaseScraper
+from .http_client import GaiaAsyncHttpClient
+from .config import GaiaConfig
+from .scraper import GaiaScraper
+
+
+class AsyncGaiaScraper(BaseScraper):
+    def __init__(self, db: ActivityStore, http_client: GaiaAsyncHttpClient, config: GaiaConfig) -> None:
+        super().__init__(db)
+        self._log = logging.getLogger(__name__)
+        self._http = http_client
+        self._config = config
+        self._sem: Optional[asyncio.Semaphore] = None
+
+    def get_platform_name(self) -> str:
+        return "gaia"
+
+    async def scrape_list(self, catalog: str, page_index: int = 1, page_size: int = 20) -> Mapping[str, Any]:
+        self._log.info("scrape_gaia_list catalog=%s page_index=%s", catalog, page_index)
+        return await self._http.get(GaiaScraper.list_path(catalog, page_index, page_size))
+
+    async def scrape_activity_full(self, sku_original_id: str, activity_type: str) -> bool:
+        assert self._sem is not None
+        async with self._sem:
+            self._log.info("scrape_gaia_full sku_id=%s", sku_original_id)
+            try:
+                detail_resp, times_resp = await asyncio.gather(
+                    self._http.get(GaiaScraper.detail_path(sku_original_id)),
+                    self._http.get(GaiaScraper.times_path(sku_original_id)),
+                )
+            except Exception as e:
+                self._log.error("gaia_full_error sku_id=%s err=%s", sku_original_id, e)
+                return False
+
+        combined_data = GaiaScraper.combine_activity_data(sku_original_id, detail_resp, times_resp)
+        if combined_data is None:
+            return False
+
+        await asyncio.to_thread(
+            self.save_activity_data,
+            activity_id=str(sku_original_id),
+            date_key=date.today().isoformat(),
+            activity_data=combined_data,
+            type_text=activity_type,
+        )
+        return True
+
+    async def _scrape_catalog(self, catalog: str, max_pages: Optional[int]) -> None:
+        tasks: Set[asyncio.Task] = set()
+        page_index = 1
+        try:
+            while True:
+                if max_pages and page_index > max_pages:
+                    break
+
+                list_resp = await self.scrape_list(catalog, page_index)
+                if list_resp.get("code") != 0:
+                    self._log.error("gaia_list_failed catalog=%s page=%s code=%s", catalog, page_index, list_resp.get("code"))
+                    break
+
+                data = list_resp.get("data", {})
+                items = data.get("page", [])
+                pagination = data.get("pagination", {})
+                total_page = pagination.get("totalPage", 0)
+
+                self._log.info("gaia_list_result catalog=%s page=%s items=%s total_pages=%s",
+                               catalog, page_index, len(items), total_page)
+
+                # 归属写入会持锁并可能触发缓冲刷写，整页放到线程里做，不阻塞事件循环
+                pairs = [(item.get("originalId"), catalog) for item in items if item.get("originalId")]
+                claimed = await asyncio.to_thread(lambda: list(self.dedup_items(pairs)))
+
+                # 详情任务交由全局信号量限流，列表翻页不必等待本页详情完成
+                for original_id, _ in claimed:
+                    tasks.add(asyncio.create_task(self.scrape_activity_full(original_id, catalog)))
+
+                if page_index >= total_page or not items:
+                    break
+
+                page_index += 1
+        except BaseException:
+            # 列表失败时取消本分类未完成的详情任务，避免它们在 HTTP 客户端关闭后继续运行
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            if tasks:
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+                for result in results:
+                    if isinstance(result, Exception):
+                        self._log.error("gaia_full_error catalog=%s err=%s", catalog, result)
+
+    async def scrape_activities_async(self, max_pages: Optional[int] = None) -> None:
+        catalogs: List[str] = self._config.catalogs or ["E", "L", "SW", "S", "WE", "SY"]
+
+        self._log.info("gaia_job_start engine=async catalogs=%s max_pages=%s concurrency=%s",
+                       catalogs, max_pages, self._config.concurrency)
+
+        self._sem = asyncio.Semaphore(self._config.concurrency)
+        async with self._http:
+            results = await asyncio.gather(
+                *(self._scrape_catalog(c, max_pages) for c in catalogs), return_exceptions=True
+            )
+        for catalog, result in zip(catalogs, results):
+            if isinstance(result, BaseException):
+                self._log.error("gaia_catalog_error catalog=%s err=%s", catalog, result)
+
+        self._log.info("gaia_job_end")
+
+    def scrape_activities(self, max_pages: Optional[int] = None) -> None:
+        asyncio.run(self.scrape_activities_async(max_pages=max_pages))
+
+
+__all__ = ["AsyncGaiaScraper"]
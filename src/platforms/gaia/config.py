@@ -11,6 +11,7 @@ class GaiaConfig(PlatformConfig):
     schedule_interval_minutes: int
     max_pages: Optional[int]
     catalogs: List[str]
+    concurrency: int
 
     def __init__(self):
         super().__init__("GAIA")
@@ -20,6 +21,7 @@ class GaiaConfig(PlatformConfig):
         self.max_pages = (int(os.getenv("GAIA_MAX_PAGES")) if os.getenv("GAIA_MAX_PAGES") else None)
         catalogs_str = os.getenv("GAIA_CATALOGS", "E,L,SW,S,WE,SY")
         self.catalogs = [c.strip() for c in catalogs_str.split(",") if c.strip()]
+        self.concurrency = max(1, int(os.getenv("GAIA_CONCURRENCY", "8")))
 
 
 __all__ = ["GaiaConfig"]
\ No newline at end of file
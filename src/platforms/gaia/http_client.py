@@ -1,34 +1,61 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Mapping, Optional
 
+from ..common.async_http_client import AsyncBaseHttpClient
 from ..common.base_http_client import BaseHttpClient
 from ..common.config import BaseConfig
+from ..common.raw_json import RawPayload
 from .config import GaiaConfig
 
 
+GAIA_HEADERS: Dict[str, str] = {
+    "content-type": "application/json",
+    "X-Requested-With": "XMLHttpRequest",
+    "Platform": "USER_WECHAT_APPLET",
+    "Accept-Encoding": "gzip,compress,br,deflate",
+    "Avg-Attribute": "",
+    "Share-Token": "",
+    "User-Token": "",
+    "Avg-Expires-Time": "",
+    "First-Attribute": "",
+}
+
+
 class GaiaHttpClient(BaseHttpClient):
     def __init__(self, base_config: BaseConfig, gaia_config: GaiaConfig) -> None:
-        super().__init__(base_config, gaia_config)
+        # 详情线程 + 每个分类一个列表线程
+        super().__init__(base_config, gaia_config, pool_size=gaia_config.concurrency + len(gaia_config.catalogs))
         self._gaia_config = gaia_config
 
     def _get_default_headers(self) -> Dict[str, str]:
         headers = super()._get_default_headers()
-        headers.update({
-            "content-type": "application/json",
-            "X-Requested-With": "XMLHttpRequest",
-            "Platform": "USER_WECHAT_APPLET",
-            "Accept-Encoding": "gzip,compress,br,deflate",
-            "Avg-Attribute": "",
-            "Share-Token": "",
-            "User-Token": "",
-            "Avg-Expires-Time": "",
-            "First-Attribute": "",
-        })
+        headers.update(GAIA_HEADERS)
         return headers
 
-    def get(self, path: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    def _is_cacheable(self, payload: Mapping[str, Any]) -> bool:
+        return payload.get("code") == 0
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> RawPayload:
         return self.request("GET", path, params=params, headers=headers)
 
 
-__all__ = ["GaiaHttpClient"]
+class GaiaAsyncHttpClient(AsyncBaseHttpClient):
+    def __init__(self, base_config: BaseConfig, gaia_config: GaiaConfig) -> None:
+        # 每个 SKU 同时发出详情和团期两个请求
+        super().__init__(base_config, gaia_config, max_connections=gaia_config.concurrency * 2)
+        self._gaia_config = gaia_config
+
+    def _get_default_headers(self) -> Dict[str, str]:
+        headers = super()._get_default_headers()
+        headers.update(GAIA_HEADERS)
+        return headers
+
+    def _is_cacheable(self, payload: Mapping[str, Any]) -> bool:
+        return payload.get("code") == 0
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> RawPayload:
+        return await self.request("GET", path, params=params, headers=headers)
+
+
+__all__ = ["GaiaHttpClient", "GaiaAsyncHttpClient", "GAIA_HEADERS"]
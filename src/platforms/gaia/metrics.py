@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any, Dict
+
+from ..common.metrics import dig, to_decimal, to_int
+
+
+def extract_gaia_metrics(activity_data: Dict[str, Any]) -> Dict[str, Any]:
+    detail = activity_data.get("detail") or {}
+    times = activity_data.get("times")
+    return {
+        "title": dig(detail, "heading"),
+        "min_price": to_decimal(dig(detail, "minPrice")) or Decimal(0),
+        "max_price": to_decimal(dig(detail, "maxPrice")) or Decimal(0),
+        "min_size": to_int(dig(detail, "minSize")) or 0,
+        "max_size": to_int(dig(detail, "maxSize")) or 0,
+        "surplus_size": to_int(dig(detail, "surplusSize")) or 0,
+        "times_count": len(times) if isinstance(times, list) else 0,
+    }
+
+
+__all__ = ["extract_gaia_metrics"]
@@ -1,17 +1,19 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple
 import logging
 from datetime import date
 
-from ...db import Database
+from ...storage.base import ActivityStore
 from ..common.base_scraper import BaseScraper
+from ..common.pipeline import Pipeline, Stage
+from ..common.raw_json import RawJson, raw_field
 from .http_client import GaiaHttpClient
 from .config import GaiaConfig
 
 
 class GaiaScraper(BaseScraper):
-    def __init__(self, db: Database, http_client: GaiaHttpClient, config: GaiaConfig) -> None:
+    def __init__(self, db: ActivityStore, http_client: GaiaHttpClient, config: GaiaConfig) -> None:
         super().__init__(db)
         self._log = logging.getLogger(__name__)
         self._http = http_client
@@ -20,39 +22,61 @@ class GaiaScraper(BaseScraper):
     def get_platform_name(self) -> str:
         return "gaia"
 
-    def scrape_list(self, catalog: str, page_index: int = 1, page_size: int = 20) -> Dict[str, Any]:
+    @staticmethod
+    def list_path(catalog: str, page_index: int, page_size: int = 20) -> str:
+        return f"/sku-wide?catalog={catalog}&packet=forSale&pageScene=page&pageIndex={page_index}&pageSize={page_size}"
+
+    @staticmethod
+    def detail_path(sku_original_id: str) -> str:
+        return f"/sku/detail?skuOriginalId={sku_original_id}"
+
+    @staticmethod
+    def times_path(sku_original_id: str) -> str:
+        return f"/trip-wide?pageScene=dayGroup&skuWideId=0&skuOriginalId={sku_original_id}"
+
+    @staticmethod
+    def combine_activity_data(sku_original_id: str, detail_resp: Mapping[str, Any],
+                              times_resp: Optional[Mapping[str, Any]]) -> Optional[RawJson]:
+        # 同步与异步引擎共用，保证落库内容一致
+        log = logging.getLogger(__name__)
+        if detail_resp.get("code") != 0:
+            log.error("gaia_detail_failed sku_id=%s code=%s", sku_original_id, detail_resp.get("code"))
+            return None
+        if times_resp is None:
+            return None
+        if times_resp.get("code") != 0:
+            log.error("gaia_times_failed sku_id=%s code=%s", sku_original_id, times_resp.get("code"))
+            return None
+        # 两个响应的 data 原文直接拼接入库，不做解析后再序列化的往返
+        return RawJson.compose({
+            "detail": raw_field(detail_resp, "data", {}),
+            "times": raw_field(times_resp, "data", {}),
+        })
+
+    def scrape_list(self, catalog: str, page_index: int = 1, page_size: int = 20) -> Mapping[str, Any]:
         self._log.info("scrape_gaia_list catalog=%s page_index=%s", catalog, page_index)
-        path = f"/sku-wide?catalog={catalog}&packet=forSale&pageScene=page&pageIndex={page_index}&pageSize={page_size}"
-        resp = self._http.get(path)
+        resp = self._http.get(self.list_path(catalog, page_index, page_size))
         return resp
 
-    def scrape_detail(self, sku_original_id: str) -> Dict[str, Any]:
+    def scrape_detail(self, sku_original_id: str) -> Mapping[str, Any]:
         self._log.info("scrape_gaia_detail sku_id=%s", sku_original_id)
-        path = f"/sku/detail?skuOriginalId={sku_original_id}"
-        resp = self._http.get(path)
+        resp = self._http.get(self.detail_path(sku_original_id))
         return resp
 
-    def scrape_times(self, sku_original_id: str) -> Dict[str, Any]:
+    def scrape_times(self, sku_original_id: str) -> Mapping[str, Any]:
         self._log.info("scrape_gaia_times sku_id=%s", sku_original_id)
-        path = f"/trip-wide?pageScene=dayGroup&skuWideId=0&skuOriginalId={sku_original_id}"
-        resp = self._http.get(path)
+        resp = self._http.get(self.times_path(sku_original_id))
         return resp
 
-    def scrape_activity_full(self, sku_original_id: str, activity_type: str) -> bool:
+    def fetch_activity_full(self, sku_original_id: str) -> Optional[RawJson]:
         detail_resp = self.scrape_detail(sku_original_id)
-        if detail_resp.get("code") != 0:
-            self._log.error("gaia_detail_failed sku_id=%s code=%s", sku_original_id, detail_resp.get("code"))
-            return False
-        
-        times_resp = self.scrape_times(sku_original_id)
-        if times_resp.get("code") != 0:
-            self._log.error("gaia_times_failed sku_id=%s code=%s", sku_original_id, times_resp.get("code"))
-            return False
+        times_resp = self.scrape_times(sku_original_id) if detail_resp.get("code") == 0 else None
+        return self.combine_activity_data(sku_original_id, detail_resp, times_resp)
 
-        combined_data = {
-            "detail": detail_resp.get("data", {}),
-            "times": times_resp.get("data", {})
-        }
+    def scrape_activity_full(self, sku_original_id: str, activity_type: str) -> bool:
+        combined_data = self.fetch_activity_full(sku_original_id)
+        if combined_data is None:
+            return False
 
         self.save_activity_data(
             activity_id=str(sku_original_id),
@@ -62,41 +86,66 @@ class GaiaScraper(BaseScraper):
         )
         return True
 
+    def iter_catalog_items(self, catalog: str, max_pages: Optional[int] = None) -> Iterator[Tuple[str, str]]:
+        page_index = 1
+        while True:
+            if max_pages and page_index > max_pages:
+                break
+
+            list_resp = self.scrape_list(catalog, page_index)
+            if list_resp.get("code") != 0:
+                self._log.error("gaia_list_failed catalog=%s page=%s code=%s", catalog, page_index, list_resp.get("code"))
+                break
+
+            data = list_resp.get("data", {})
+            items = data.get("page", [])
+            pagination = data.get("pagination", {})
+            total_page = pagination.get("totalPage", 0)
+
+            self._log.info("gaia_list_result catalog=%s page=%s items=%s total_pages=%s",
+                           catalog, page_index, len(items), total_page)
+
+            for item in items:
+                original_id = item.get("originalId")
+                if original_id:
+                    yield original_id, catalog
+
+            if page_index >= total_page or not items:
+                break
+
+            page_index += 1
+
+    def _detail_stage(self, item: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        sku_original_id, catalog = item
+        combined_data = self.fetch_activity_full(sku_original_id)
+        if combined_data is None:
+            return None
+        return {
+            "activity_id": str(sku_original_id),
+            "date_key": date.today().isoformat(),
+            "activity_data": combined_data,
+            "type_text": catalog,
+        }
+
+    def _persist_stage(self, record: Dict[str, Any]) -> None:
+        self.save_activity_data(**record)
+
     def scrape_activities(self, max_pages: Optional[int] = None) -> None:
         catalogs = self._config.catalogs or ["E", "L", "SW", "S", "WE", "SY"]
-        
-        self._log.info("gaia_job_start catalogs=%s max_pages=%s", catalogs, max_pages)
-        
-        for catalog in catalogs:
-            page_index = 1
-            while True:
-                if max_pages and page_index > max_pages:
-                    break
-                    
-                list_resp = self.scrape_list(catalog, page_index)
-                if list_resp.get("code") != 0:
-                    self._log.error("gaia_list_failed catalog=%s page=%s code=%s", catalog, page_index, list_resp.get("code"))
-                    break
-                
-                data = list_resp.get("data", {})
-                items = data.get("page", [])
-                pagination = data.get("pagination", {})
-                total_page = pagination.get("totalPage", 0)
-                
-                self._log.info("gaia_list_result catalog=%s page=%s items=%s total_pages=%s", 
-                              catalog, page_index, len(items), total_page)
-                
-                for item in items:
-                    original_id = item.get("originalId")
-                    if original_id:
-                        self.scrape_activity_full(original_id, catalog)
-                
-                if page_index >= total_page or not items:
-                    break
-                    
-                page_index += 1
-        
+
+        self._log.info("gaia_job_start catalogs=%s max_pages=%s concurrency=%s", catalogs, max_pages, self._config.concurrency)
+
+        pipeline = Pipeline(
+            "gaia",
+            sources=[(catalog, lambda c=catalog: self.dedup_items(self.iter_catalog_items(c, max_pages))) for catalog in catalogs],
+            stages=[
+                Stage("detail", self._detail_stage, workers=self._config.concurrency),
+                Stage("persist", self._persist_stage),
+            ],
+        )
+        pipeline.run()
+
         self._log.info("gaia_job_end")
 
 
-__all__ = ["GaiaScraper"]
\ No newline at end of file
+__all__ = ["GaiaScraper"]
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import atexit
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, MutableMapping, Optional
+import logging
+
+from ...storage import open_database
+from ..common.base_scraper import BaseScraper
+from ..common.config import BaseConfig
+from ..common.dedup import SharedSeenSet
+from .async_scraper import AsyncGaiaScraper
+from .config import GaiaConfig
+from .http_client import GaiaAsyncHttpClient, GaiaHttpClient
+from .scraper import GaiaScraper
+
+
+@dataclass
+class CatalogResult:
+    catalog: str
+    inserted: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    elapsed_seconds: float = 0.0
+    error: Optional[str] = None
+
+
+# 以下全局变量只在子进程中使用：每个进程各自持有 HTTP 会话和数据库连接
+_worker_config: Optional[GaiaConfig] = None
+_worker_scraper: Optional[BaseScraper] = None
+_worker_seen: Optional[SharedSeenSet] = None
+
+
+def _init_worker(engine: str, seen: MutableMapping[bytes, int]) -> None:
+    global _worker_config, _worker_scraper, _worker_seen
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s %(levelname)s %(name)s [worker-{os.getpid()}] - %(message)s",
+    )
+    base_config = BaseConfig.from_env()
+    db = open_database(base_config)
+    atexit.register(db.close)
+    _worker_config = GaiaConfig()
+    _worker_seen = SharedSeenSet(seen)
+    if engine == "async":
+        _worker_scraper = AsyncGaiaScraper(db, GaiaAsyncHttpClient(base_config, _worker_config), _worker_config)
+    else:
+        _worker_scraper = GaiaScraper(db, GaiaHttpClient(base_config, _worker_config), _worker_config)
+
+
+def _scrape_catalog(catalog: str, max_pages: Optional[int]) -> CatalogResult:
+    assert _worker_config is not None and _worker_scraper is not None and _worker_seen is not None
+    _worker_config.catalogs = [catalog]
+    result = CatalogResult(catalog)
+    started = time.monotonic()
+    try:
+        stats = _worker_scraper.run(max_pages=max_pages, seen=_worker_seen)
+        result.inserted, result.changed, result.unchanged = stats.inserted, stats.changed, stats.unchanged
+    except Exception as e:
+        logging.getLogger(__name__).exception("gaia_shard_failed catalog=%s", catalog)
+        result.error = f"{type(e).__name__}: {e}"
+    result.elapsed_seconds = round(time.monotonic() - started, 1)
+    return result
+
+
+def run_sharded(catalogs: List[str], workers: int, max_pages: Optional[int] = None, engine: str = "sync") -> List[CatalogResult]:
+    log = logging.getLogger(__name__)
+    # 子进程通过同一个状态文件共享限速，保证整体速率不随进程数放大
+    if not os.getenv("RATE_LIMIT_STATE_FILE"):
+        os.environ["RATE_LIMIT_STATE_FILE"] = os.path.join(tempfile.gettempdir(), f"wellesley-gaia-rate-{os.getpid()}.json")
+
+    log.info("gaia_sharded_start catalogs=%s workers=%s engine=%s", catalogs, workers, engine)
+    # spawn 避免子进程继承父进程的数据库连接
+    ctx = multiprocessing.get_context("spawn")
+    # 本次运行内跨分类、跨进程去重：同一活动出现在多个分类时只抓一次详情
+    with ctx.Manager() as manager:
+        seen = manager.dict()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(engine, seen)) as pool:
+            results = list(pool.map(_scrape_catalog, catalogs, [max_pages] * len(catalogs)))
+
+    for r in results:
+        log.info(
+            "gaia_shard_result catalog=%s inserted=%s changed=%s unchanged=%s elapsed_s=%s error=%s",
+            r.catalog, r.inserted, r.changed, r.unchanged, r.elapsed_seconds, r.error,
+        )
+    failed = [r.catalog for r in results if r.error]
+    log.info(
+        "gaia_sharded_end catalogs=%s failed=%s inserted=%s changed=%s unchanged=%s",
+        len(results), failed, sum(r.inserted for r in results), sum(r.changed for r in results),
+        sum(r.unchanged for r in results),
+    )
+    return results
+
+
+__all__ = ["CatalogResult", "run_sharded"]
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Tuple
+
+from .gaia.metrics import extract_gaia_metrics
+from .tiga.metrics import extract_tiga_metrics
+
+
+# activity_detail 上的类型化指标列，写入时从 activity_data 提取
+METRIC_COLUMNS: Tuple[str, ...] = (
+    "title",
+    "collect_count",
+    "comment_count",
+    "comment_average",
+    "one_week_uv",
+    "two_month_uv",
+    "history_signup_count",
+    "min_price",
+    "max_price",
+    "min_size",
+    "max_size",
+    "surplus_size",
+    "times_count",
+)
+
+METRIC_COLUMN_TYPES: Dict[str, str] = {
+    "title": "TEXT",
+    "collect_count": "BIGINT",
+    "comment_count": "BIGINT",
+    "comment_average": "NUMERIC",
+    "one_week_uv": "BIGINT",
+    "two_month_uv": "BIGINT",
+    "history_signup_count": "BIGINT",
+    "min_price": "NUMERIC",
+    "max_price": "NUMERIC",
+    "min_size": "BIGINT",
+    "max_size": "BIGINT",
+    "surplus_size": "BIGINT",
+    "times_count": "INTEGER",
+}
+
+# 仪表板可排序的指标（各建 (platform, date_key, metric) 索引）；可为空的列按 NULLS LAST 建索引
+SORTABLE_METRICS: Tuple[str, ...] = tuple(c for c in METRIC_COLUMNS if c != "title")
+NULLABLE_METRICS = frozenset({"comment_average"})
+
+_EXTRACTORS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "tiga": extract_tiga_metrics,
+    "gaia": extract_gaia_metrics,
+}
+
+
+def extract_metrics(platform: str, activity_data: Dict[str, Any]) -> Tuple[Any, ...]:
+    extractor = _EXTRACTORS.get(platform)
+    values = extractor(activity_data) if extractor else {}
+    return tuple(values.get(c) for c in METRIC_COLUMNS)
+
+
+__all__ = ["METRIC_COLUMNS", "METRIC_COLUMN_TYPES", "NULLABLE_METRICS", "SORTABLE_METRICS", "extract_metrics"]
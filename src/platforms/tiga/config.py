@@ -20,6 +20,8 @@ class TigaConfig(PlatformConfig):
     domestic_category_id: Optional[str]
     overseas_category_id: Optional[str]
     max_pages: Optional[int]
+    detail_concurrency: int
+    list_concurrency: int
 
     def __init__(self):
         super().__init__("TIGA")
@@ -37,6 +39,8 @@ class TigaConfig(PlatformConfig):
         self.domestic_category_id = os.getenv("TIGA_DOMESTIC_CATEGORY_ID")
         self.overseas_category_id = os.getenv("TIGA_OVERSEAS_CATEGORY_ID")
         self.max_pages = (int(os.getenv("TIGA_MAX_PAGES")) if os.getenv("TIGA_MAX_PAGES") else None)
+        self.detail_concurrency = max(1, int(os.getenv("TIGA_DETAIL_CONCURRENCY", "1")))
+        self.list_concurrency = max(1, int(os.getenv("TIGA_LIST_CONCURRENCY", "2")))
 
 
 __all__ = ["TigaConfig"]
\ No newline at end of file
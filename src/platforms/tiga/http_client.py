@@ -1,15 +1,17 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Mapping, Optional
 
 from ..common.base_http_client import BaseHttpClient
 from ..common.config import BaseConfig
+from ..common.raw_json import RawPayload
 from .config import TigaConfig
 
 
 class TigaHttpClient(BaseHttpClient):
     def __init__(self, base_config: BaseConfig, tiga_config: TigaConfig) -> None:
-        super().__init__(base_config, tiga_config)
+        # 详情线程 + 境内/境外两路列表预取线程
+        super().__init__(base_config, tiga_config, pool_size=tiga_config.detail_concurrency + 2 * tiga_config.list_concurrency)
         self._tiga_config = tiga_config
 
     def _get_default_headers(self) -> Dict[str, str]:
@@ -20,7 +22,10 @@ class TigaHttpClient(BaseHttpClient):
         })
         return headers
 
-    def post(self, path: str, data: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    def _is_cacheable(self, payload: Mapping[str, Any]) -> bool:
+        return payload.get("code") == 200
+
+    def post(self, path: str, data: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> RawPayload:
         return self.request("POST", path, data=data, headers=headers)
 
 
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from ..common.metrics import dig, to_decimal, to_int
+
+
+def extract_tiga_metrics(activity_data: Dict[str, Any]) -> Dict[str, Any]:
+    activity_type = dig(activity_data, "activity_times", "times", 0, "status", "activityType")
+    return {
+        "title": activity_data.get("title"),
+        "collect_count": to_int(activity_data.get("collect_count")) or 0,
+        "comment_count": to_int(dig(activity_data, "total_comment", "count")) or 0,
+        "comment_average": to_decimal(dig(activity_data, "total_comment", "average")),
+        "one_week_uv": to_int(dig(activity_type, "one_week_uv")) or 0,
+        "two_month_uv": to_int(dig(activity_type, "two_month_uv")) or 0,
+        "history_signup_count": to_int(dig(activity_type, "history_signup_count")) or 0,
+    }
+
+
+__all__ = ["extract_tiga_metrics"]
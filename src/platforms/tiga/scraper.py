@@ -1,17 +1,21 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Deque, Dict, Iterator, Mapping, Optional, Tuple
 import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import date
 
-from ...db import Database
+from ...storage.base import ActivityStore
 from ..common.base_scraper import BaseScraper
+from ..common.pipeline import Pipeline, Stage
+from ..common.raw_json import RawJson, raw_field
 from .http_client import TigaHttpClient
 from .config import TigaConfig
 
 
 class TigaScraper(BaseScraper):
-    def __init__(self, db: Database, http_client: TigaHttpClient, config: TigaConfig) -> None:
+    def __init__(self, db: ActivityStore, http_client: TigaHttpClient, config: TigaConfig) -> None:
         super().__init__(db)
         self._log = logging.getLogger(__name__)
         self._http = http_client
@@ -20,7 +24,7 @@ class TigaScraper(BaseScraper):
     def get_platform_name(self) -> str:
         return "tiga"
 
-    def scrape_domestic(self, category_id: str, page: int) -> Dict[str, Any]:
+    def scrape_domestic(self, category_id: str, page: int) -> Mapping[str, Any]:
         self._log.info("scrape_domestic category_id=%s page=%s", category_id, page)
         data = {
             "id": str(category_id),
@@ -35,7 +39,7 @@ class TigaScraper(BaseScraper):
         resp = self._http.post("/api/v2/list/datas", data)
         return resp
 
-    def scrape_overseas(self, category_id: str, page: int) -> Dict[str, Any]:
+    def scrape_overseas(self, category_id: str, page: int) -> Mapping[str, Any]:
         self._log.info("scrape_overseas category_id=%s page=%s", category_id, page)
         data = {
             "channel": self._config.channel or "appstore",
@@ -54,7 +58,7 @@ class TigaScraper(BaseScraper):
         resp = self._http.post("/api/v2/list/datas", data)
         return resp
 
-    def scrape_activity_detail(self, activity_id: str, type_value: int = 0, stat_param: Optional[str] = None, source_type: str = "") -> Dict[str, Any]:
+    def fetch_activity_detail(self, activity_id: str, type_value: int = 0, stat_param: Optional[str] = None) -> Mapping[str, Any]:
         self._log.info("scrape_detail activity_id=%s type=%s", activity_id, type_value)
         data = {
             "channel": self._config.channel or "appstore",
@@ -73,74 +77,125 @@ class TigaScraper(BaseScraper):
         if stat_param:
             data["stat_param"] = stat_param
         resp = self._http.post("/api/v1/activity/detail", data)
-        
+
         code = resp.get("code")
         if code != 200:
             self._log.error("detail_failed activity_id=%s code=%s", activity_id, code)
-            return resp
-        
-        self.save_activity_data(
-            activity_id=str(activity_id),
-            date_key=date.today().isoformat(),
-            activity_data=(resp.get("data") or {}),
-            type_text=source_type or "",
-        )
         return resp
 
+    def _detail_record(self, activity_id: str, resp: Mapping[str, Any], source_type: str) -> Optional[Dict[str, Any]]:
+        if resp.get("code") != 200:
+            return None
+        # data 原文直接入库；为空（null/{}）时与原先一样存 {}
+        data = raw_field(resp, "data")
+        return {
+            "activity_id": str(activity_id),
+            "date_key": date.today().isoformat(),
+            "activity_data": data if data.value else RawJson.of({}),
+            "type_text": source_type or "",
+        }
+
+    def scrape_activity_detail(self, activity_id: str, type_value: int = 0, stat_param: Optional[str] = None, source_type: str = "") -> Mapping[str, Any]:
+        resp = self.fetch_activity_detail(activity_id, type_value=type_value, stat_param=stat_param)
+        record = self._detail_record(activity_id, resp, source_type)
+        if record is not None:
+            self.save_activity_data(**record)
+        return resp
+
+    @staticmethod
+    def _item_activity_id(item: Optional[Dict[str, Any]]) -> Optional[str]:
+        if not item:
+            return None
+        jump_id = item.get("jump_id")
+        if jump_id is not None:
+            return str(jump_id)
+        if item.get("id") is not None:
+            return str(item.get("id"))
+        return None
+
+    @staticmethod
+    def _last_page(resp: Mapping[str, Any], page: int, max_pages: Optional[int]) -> int:
+        # 与逐页循环的终止条件一致：处理完第 p 页后若 p * 页大小 >= total 即停止
+        data = resp.get("data") or {}
+        items = data.get("items") or []
+        if resp.get("code") != 200 or not items:
+            return page
+        last = max(page, -(-int(data.get("total") or 0) // len(items)))
+        return min(last, max_pages) if max_pages else last
+
+    def iter_list_items(self, source_type: str, category_id: str, max_pages: Optional[int] = None) -> Iterator[Tuple[str, str]]:
+        fetch_page = self.scrape_domestic if source_type == "domestic" else self.scrape_overseas
+        window = self._config.list_concurrency
+        pending: Deque[Tuple[int, Future]] = deque()
+        page = 0
+        resp = fetch_page(category_id, page)
+        # 第 0 页返回 total 后即可推算总页数，后续页按窗口并发预取，但仍按页序处理
+        last_page = self._last_page(resp, page, max_pages)
+        next_page = 1
+        with ThreadPoolExecutor(max_workers=window, thread_name_prefix=f"tiga-{source_type}-list") as pool:
+            try:
+                while True:
+                    while next_page <= last_page and len(pending) < window:
+                        pending.append((next_page, pool.submit(fetch_page, category_id, next_page)))
+                        next_page += 1
+
+                    items = (resp.get("data") or {}).get("items") or []
+                    if resp.get("code") != 200:
+                        self._log.error("%s_failed page=%s code=%s", source_type, page, resp.get("code"))
+                        break
+                    self._log.info("%s_page_result page=%s items=%s", source_type, page, len(items))
+
+                    for it in items:
+                        aid = self._item_activity_id(it)
+                        if aid:
+                            yield aid, source_type
+                    total = (resp.get("data") or {}).get("total") or 0
+                    if not items or page * len(items) >= int(total):
+                        break
+                    last_page = max(last_page, self._last_page(resp, page, max_pages))
+                    if not pending and next_page > last_page:
+                        break
+                    if not pending:
+                        pending.append((next_page, pool.submit(fetch_page, category_id, next_page)))
+                        next_page += 1
+                    page, future = pending.popleft()
+                    resp = future.result()
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def _detail_stage(self, item: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        aid, source_type = item
+        resp = self.fetch_activity_detail(aid, type_value=0)
+        return self._detail_record(aid, resp, source_type)
+
+    def _persist_stage(self, record: Dict[str, Any]) -> None:
+        self.save_activity_data(**record)
+
     def scrape_activities(self, max_pages: Optional[int] = None) -> None:
         domestic_id = self._config.domestic_category_id
         overseas_id = self._config.overseas_category_id
-        
+
         if not domestic_id or not overseas_id:
             raise ValueError("TIGA_DOMESTIC_CATEGORY_ID and TIGA_OVERSEAS_CATEGORY_ID must be configured")
-            
-        self._log.info("tiga_job_start domestic_id=%s overseas_id=%s max_pages=%s", domestic_id, overseas_id, max_pages)
-        
-        # Scrape domestic pages
-        page = 0
-        while True:
-            if max_pages and page > max_pages:
-                break
-            dom = self.scrape_domestic(domestic_id, page)
-            items = (dom.get("data") or {}).get("items") or []
-            if dom.get("code") != 200:
-                self._log.error("domestic_failed page=%s code=%s", page, dom.get("code"))
-                break
-            self._log.info("domestic_page_result page=%s items=%s", page, len(items))
-            
-            for it in items:
-                jump_id = it.get("jump_id") if it else None
-                aid = str(jump_id if jump_id is not None else it.get("id") if it and it.get("id") is not None else None)
-                if aid:
-                    self.scrape_activity_detail(aid, type_value=0, source_type="domestic")
-            total = (dom.get("data") or {}).get("total") or 0
-            if not items or page * len(items) >= int(total):
-                break
-            page += 1
-
-        # Scrape overseas pages  
-        page = 0
-        while True:
-            if max_pages and page > max_pages:
-                break
-            over = self.scrape_overseas(overseas_id, page)
-            items = (over.get("data") or {}).get("items") or []
-            if over.get("code") != 200:
-                self._log.error("overseas_failed page=%s code=%s", page, over.get("code"))
-                break
-            self._log.info("overseas_page_result page=%s items=%s", page, len(items))
-            
-            for it in items:
-                jump_id = it.get("jump_id") if it else None
-                aid = str(jump_id if jump_id is not None else it.get("id") if it and it.get("id") is not None else None)
-                if aid:
-                    self.scrape_activity_detail(aid, type_value=0, source_type="overseas")
-            total = (over.get("data") or {}).get("total") or 0
-            if not items or page * len(items) >= int(total):
-                break
-            page += 1
-        
+
+        self._log.info("tiga_job_start domestic_id=%s overseas_id=%s max_pages=%s concurrency=%s",
+                       domestic_id, overseas_id, max_pages, self._config.detail_concurrency)
+
+        pipeline = Pipeline(
+            "tiga",
+            sources=[
+                ("domestic", lambda: self.dedup_items(self.iter_list_items("domestic", domestic_id, max_pages))),
+                ("overseas", lambda: self.dedup_items(self.iter_list_items("overseas", overseas_id, max_pages))),
+            ],
+            stages=[
+                Stage("detail", self._detail_stage, workers=self._config.detail_concurrency),
+                Stage("persist", self._persist_stage),
+            ],
+        )
+        pipeline.run()
+
         self._log.info("tiga_job_end")
 
 
-__all__ = ["TigaScraper"]
\ No newline at end of file
+__all__ = ["TigaScraper"]
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+import logging
+import threading
+import time
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Entry:
+    value: Any
+    version: int
+    created: float
+
+
+class _Flight:
+    # 同一个键正在进行的计算；并发的相同请求等待它而不是各自查库
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class ResultCache:
+    """Web 进程内的查询结果缓存（LRU + TTL）。
+
+    键为 (路由, 规范化参数)，每个条目记录计算时所属平台的数据版本；版本由写入端每轮结束时递增
+    （见 data_version 表），版本变化或超过 TTL 的条目在 stale_seconds 宽限内仍先返回旧值并在后台刷新。
+    同一键的并发未命中只计算一次。
+    """
+
+    def __init__(
+        self,
+        version_source: Callable[[], Dict[str, int]],
+        ttl_seconds: float = 300.0,
+        stale_seconds: float = 30.0,
+        max_entries: int = 256,
+        version_check_seconds: float = 2.0,
+    ) -> None:
+        self._log = logging.getLogger(__name__)
+        self._version_source = version_source
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.version_check_seconds = version_check_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, Hashable], _Entry]" = OrderedDict()
+        self._flights: Dict[Tuple[str, Hashable], _Flight] = {}
+        # 版本每 version_check_seconds 最多查询一次；记录每个平台版本变化被观察到的时间，用于计算旧值的宽限期
+        self._versions: Dict[str, int] = {}
+        self._version_changed_at: Dict[str, float] = {}
+        self._versions_checked = float("-inf")
+        self._version_lock = threading.Lock()
+        self._counters = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "errors": 0, "evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def _version(self, platform: str) -> int:
+        now = time.monotonic()
+        if now - self._versions_checked >= self.version_check_seconds:
+            with self._version_lock:
+                if now - self._versions_checked >= self.version_check_seconds:
+                    try:
+                        versions = self._version_source()
+                    except Exception as e:
+                        # 查不到版本时沿用上次的值，只靠 TTL 失效
+                        self._log.warning("result_cache_version_failed err=%s", e)
+                        versions = self._versions
+                    for name, version in versions.items():
+                        if self._versions.get(name, version) != version:
+                            self._version_changed_at[name] = now
+                    self._versions = dict(versions)
+                    self._versions_checked = now
+        return self._versions.get(platform, 0)
+
+    def _stale_since(self, platform: str, entry: _Entry, version: int) -> float:
+        expires = entry.created + self.ttl_seconds
+        if entry.version != version:
+            return min(expires, self._version_changed_at.get(platform, entry.created))
+        return expires
+
+    def get(self, route: str, params: Hashable, platform: str, compute: Callable[[], T]) -> T:
+        if not self.enabled:
+            return compute()
+        key = (route, params)
+        version = self._version(platform)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                stale_since = self._stale_since(platform, entry, version)
+                if now < stale_since:
+                    self._counters["hits"] += 1
+                    return entry.value
+                if now - stale_since < self.stale_seconds:
+                    self._counters["stale_hits"] += 1
+                    if key not in self._flights:
+                        flight = self._flights[key] = _Flight()
+                        threading.Thread(
+                            target=self._compute, args=(key, version, compute, flight),
+                            name="result-cache-refresh", daemon=True,
+                        ).start()
+                    return entry.value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._counters["misses"] += 1
+            else:
+                self._counters["coalesced"] += 1
+        if leader:
+            self._compute(key, version, compute, flight)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _compute(self, key: Tuple[str, Hashable], version: int, compute: Callable[[], Any], flight: _Flight) -> None:
+        # 条目记录计算开始前的版本：计算期间版本变化时，下次访问会再刷新
+        try:
+            flight.value = compute()
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._counters["errors"] += 1
+            self._log.warning("result_cache_compute_failed route=%s err=%s", key[0], e)
+        else:
+            with self._lock:
+                self._entries[key] = _Entry(flight.value, version, time.monotonic())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._counters["evictions"] += 1
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["in_flight"] = len(self._flights)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 3) if lookups else 0.0
+        stats["versions"] = dict(self._versions)
+        return stats
+
+
+__all__ = ["ResultCache"]
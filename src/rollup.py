@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from .platforms.metrics import METRIC_COLUMN_TYPES, METRIC_COLUMNS
+
+
+# 趋势页专用的窄表：每个 (platform, date_key, activity_id) 一行，只含类型化指标列，不含 JSONB
+ROLLUP_TABLE = "activity_daily_rollup"
+ROLLUP_COLUMNS = ("platform", "activity_id", "date_key") + METRIC_COLUMNS
+
+CREATE_ROLLUP_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+        platform TEXT NOT NULL,
+        activity_id TEXT NOT NULL,
+        date_key DATE NOT NULL,
+        {", ".join(f"{c} {METRIC_COLUMN_TYPES[c]}" for c in METRIC_COLUMNS)},
+        updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (platform, date_key, activity_id)
+    )
+"""
+
+
+def upsert_rollup_sql(source: str, where_sql: str = "") -> str:
+    # 从 source（activity_detail 或写入时的暂存表）合并到汇总表，指标未变的行不重写
+    columns = ", ".join(ROLLUP_COLUMNS)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in METRIC_COLUMNS)
+    changed = " OR ".join(f"{ROLLUP_TABLE}.{c} IS DISTINCT FROM EXCLUDED.{c}" for c in METRIC_COLUMNS)
+    return f"""
+        INSERT INTO {ROLLUP_TABLE} ({columns})
+        SELECT {columns} FROM {source}
+        {where_sql}
+        ON CONFLICT (platform, date_key, activity_id) DO UPDATE SET
+            {updates}, updated_at = NOW()
+        WHERE {changed}
+    """
+
+
+__all__ = ["CREATE_ROLLUP_SQL", "ROLLUP_COLUMNS", "ROLLUP_TABLE", "upsert_rollup_sql"]
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from ..db import Database
+from ..platforms.common.config import BaseConfig
+from .base import ActivityReader, ActivityStore
+from .queries import DashboardPage, DashboardQuery, decode_cursor
+from .sqlite import SqliteDatabase, SqliteReader, is_sqlite_url
+
+
+def open_database(cfg: BaseConfig) -> ActivityStore:
+    # 按 DATABASE_URL 选择后端：sqlite:/// 为嵌入式 SQLite，其余为 Postgres
+    if is_sqlite_url(cfg.database_url):
+        return SqliteDatabase.open(
+            cfg.database_url,
+            batch_size=cfg.db_batch_size,
+            flush_interval_seconds=cfg.db_flush_interval_seconds,
+            storage_mode=cfg.db_storage_mode,
+        )
+    return Database.open(
+        cfg.database_url,
+        batch_size=cfg.db_batch_size,
+        flush_interval_seconds=cfg.db_flush_interval_seconds,
+        partition_months_ahead=cfg.db_partition_months_ahead,
+        storage_mode=cfg.db_storage_mode,
+        delta_max_ratio=cfg.db_delta_max_ratio,
+    )
+
+
+def open_reader(cfg: BaseConfig) -> ActivityReader:
+    if is_sqlite_url(cfg.database_url):
+        return SqliteReader(cfg.database_url)
+    # 延迟导入：SQLite 部署不需要 psycopg_pool
+    from .postgres import PostgresReader
+    return PostgresReader(cfg)
+
+
+__all__ = [
+    "ActivityReader",
+    "ActivityStore",
+    "DashboardPage",
+    "DashboardQuery",
+    "decode_cursor",
+    "is_sqlite_url",
+    "open_database",
+    "open_reader",
+]
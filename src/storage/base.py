@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import replace
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Protocol, Sequence, Tuple
+
+from ..db import WriteStats
+from ..delta import restore
+from ..platforms.common.raw_json import ActivityData
+from .queries import ACTIVITY_DOCUMENT_SQL, DashboardPage, DashboardQuery, dashboard_page, dashboard_sql, export_sql, trend_sql
+
+
+class ActivityStore(Protocol):
+    # 抓取器与 CLI 使用的写入接口：Postgres 的 Database 与 SqliteDatabase 都实现它
+    def save_activity_detail(self, activity_id: str, date_key: str, activity_data: ActivityData, type_text: str, platform: str) -> None: ...
+
+    def save_membership(self, activity_id: str, date_key: str, type_text: str, platform: str) -> None: ...
+
+    def flush(self) -> int: ...
+
+    def take_write_stats(self, platform: str) -> WriteStats: ...
+
+    def bulk_ingest(
+        self,
+        records: Iterable[Tuple[str, str, Any, str, ActivityData]],
+        chunk_size: int = 5000,
+        progress: Optional[Callable[[int, WriteStats, float], None]] = None,
+    ) -> WriteStats: ...
+
+    def refresh_rollup(self, since: date) -> int: ...
+
+    def bump_data_version(self, platform: Optional[str] = None) -> None: ...
+
+    def apply_retention(self, keep_months: int, drop: bool = False) -> List[str]: ...
+
+    def close(self) -> None: ...
+
+
+class ActivityReader(ABC):
+    # Web 使用的只读查询；SQL 由 queries 模块统一生成，各后端只负责执行
+    backend = ""
+
+    @abstractmethod
+    def execute(self, sql: str, params: Sequence[Any]) -> List[Tuple[Any, ...]]:
+        """执行 Postgres 写法的查询并返回全部行；date_key 列统一返回 date。"""
+
+    def iter_rows(self, sql: str, params: Sequence[Any], itersize: int = 500) -> Iterator[Tuple[Any, ...]]:
+        """逐行返回结果，后端应分批从服务端取数而不是一次物化全部行。"""
+        yield from self.execute(sql, params)
+
+    @abstractmethod
+    def ping(self) -> None:
+        """连通性检查，失败时抛异常。"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend}
+
+    def close(self) -> None:
+        pass
+
+    def load_json(self, value: Any) -> Any:
+        return value
+
+    def data_versions(self) -> Dict[str, int]:
+        # 各平台的数据版本，写入端每轮结束时递增；查询结果缓存以此判断是否失效
+        return {platform: int(version) for platform, version in self.execute("SELECT platform, version FROM data_version", ())}
+
+    def dashboard_page(self, query: DashboardQuery) -> DashboardPage:
+        sql, params = dashboard_sql(query)
+        page = dashboard_page(query, list(self.iter_rows(sql, params, itersize=query.limit + 1)))
+        if query.backward and not page.rows:
+            # 向前翻过了第一行（例如期间数据有变化）：回到第一页
+            return self.dashboard_page(replace(query, cursor=None, backward=False))
+        return page
+
+    def export_rows(self, query: DashboardQuery) -> Iterator[Tuple[Any, ...]]:
+        sql, params = export_sql(query)
+        return self.iter_rows(sql, params)
+
+    def trend_rows(self, platform: str, columns: Sequence[str], start: date, end: date, activity_id: str = "") -> List[Tuple[Any, ...]]:
+        sql, params = trend_sql(platform, columns, start, end, activity_id)
+        return self.execute(sql, params)
+
+    def iter_trend_rows(self, platform: str, columns: Sequence[str], start: date, end: date, activity_id: str = "") -> Iterator[Tuple[Any, ...]]:
+        sql, params = trend_sql(platform, columns, start, end, activity_id)
+        return self.iter_rows(sql, params)
+
+    def activity_document(self, platform: str, activity_id: str, date_key: date) -> Optional[Tuple[Any, str]]:
+        # 返回 (完整 activity_data, type)，增量行在这里还原
+        rows = self.execute(ACTIVITY_DOCUMENT_SQL, (activity_id, date_key, platform))
+        if not rows:
+            return None
+        data, type_text, storage_kind, base = rows[0]
+        return restore(self.load_json(data), storage_kind, self.load_json(base)), type_text
+
+
+__all__ = ["ActivityReader", "ActivityStore"]
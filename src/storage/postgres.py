@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import itertools
+import threading
+import time
+
+import psycopg
+from psycopg_pool import ConnectionPool
+
+from ..platforms.common.config import BaseConfig
+from ..timing import phase, record_phase
+from .base import ActivityReader
+
+
+class PoolMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.acquired += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "acquired": self.acquired,
+                "wait_ms_total": round(self.wait_seconds_total * 1000, 1),
+                "wait_ms_avg": round(self.wait_seconds_total * 1000 / self.acquired, 2) if self.acquired else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 1),
+            }
+
+
+class PostgresReader(ActivityReader):
+    backend = "postgres"
+
+    def __init__(self, cfg: BaseConfig) -> None:
+        self._cfg = cfg
+        self._pool: Optional[ConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        self.pool_metrics = PoolMetrics()
+        self._cursor_ids = itertools.count(1)
+
+    def get_pool(self) -> ConnectionPool:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    cfg = self._cfg
+                    # check 在借出前 ping 一次连接，失效连接会被丢弃重建
+                    self._pool = ConnectionPool(
+                        cfg.database_url,
+                        min_size=cfg.web_db_pool_min,
+                        max_size=cfg.web_db_pool_max,
+                        timeout=cfg.web_db_pool_timeout,
+                        max_idle=300,
+                        max_lifetime=3600,
+                        check=ConnectionPool.check_connection,
+                        name="web",
+                        open=True,
+                    )
+        return self._pool
+
+    @contextmanager
+    def connection(self) -> Iterator[psycopg.Connection]:
+        pool = self.get_pool()
+        started = time.perf_counter()
+        with pool.connection() as conn:
+            waited = time.perf_counter() - started
+            self.pool_metrics.record_wait(waited)
+            record_phase("connect", waited)
+            yield conn
+
+    def execute(self, sql: str, params: Sequence[Any]) -> List[Tuple[Any, ...]]:
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                with phase("execute"):
+                    cur.execute(sql, params, prepare=True)
+                with phase("fetch"):
+                    return cur.fetchall()
+
+    def iter_rows(self, sql: str, params: Sequence[Any], itersize: int = 500) -> Iterator[Tuple[Any, ...]]:
+        # 命名游标即服务端游标（DECLARE ... FETCH），每次只取 itersize 行；
+        # 连接在迭代结束（或生成器被关闭）前一直借出，事务由连接池归还时结束
+        with self.connection() as conn:
+            with conn.cursor(name=f"web_rows_{next(self._cursor_ids)}") as cur:
+                with phase("execute"):
+                    cur.execute(sql, params)
+                while True:
+                    with phase("fetch"):
+                        rows = cur.fetchmany(itersize)
+                    if not rows:
+                        return
+                    yield from rows
+
+    def ping(self) -> None:
+        with self.connection() as conn:
+            conn.execute("SELECT 1")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "pool": self.get_pool().get_stats(),
+            "acquire_wait": self.pool_metrics.as_dict(),
+        }
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+
+
+__all__ = ["PoolMetrics", "PostgresReader"]
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Any, List, Optional, Sequence, Tuple
+import base64
+import binascii
+import json
+
+from ..platforms.metrics import METRIC_COLUMN_TYPES, NULLABLE_METRICS
+
+
+# Web 查询的 SQL 统一以 Postgres 写法（%s 占位符、ILIKE）生成，SQLite 后端执行前再做转换
+
+# 同一活动可能属于多个分类/类型：type 列只保存首次出现的分类，其余记录在 activity_membership
+MEMBERSHIP_FILTER_SQL = """(type = %s OR EXISTS (
+        SELECT 1 FROM activity_membership m
+        WHERE m.platform = activity_detail.platform
+          AND m.date_key = activity_detail.date_key
+          AND m.activity_id = activity_detail.activity_id
+          AND m.type = %s))"""
+
+# DB_STORAGE_MODE=delta 时部分行只存相对同月基准快照的补丁，详情页连同基准行一起取出后还原
+ACTIVITY_DOCUMENT_SQL = """
+    SELECT d.activity_data, d.type, d.storage_kind, b.activity_data
+    FROM activity_detail d
+    LEFT JOIN activity_detail b
+      ON d.storage_kind = 'delta'
+     AND b.platform = d.platform
+     AND b.activity_id = d.activity_id
+     AND b.date_key = d.base_date
+    WHERE d.activity_id = %s AND d.date_key = %s AND d.platform = %s
+    LIMIT 1
+"""
+
+
+def metric_order_sql(column: str, order_sql: str, nulls: str = "LAST") -> str:
+    # 非空指标（写入时已 COALESCE 为 0）不加 NULLS LAST，才能直接使用 (platform, date_key, metric) 索引
+    if column in NULLABLE_METRICS:
+        return f"{column} {order_sql} NULLS {nulls}"
+    return f"{column} {order_sql}"
+
+
+# 翻页游标 = 当前页边界行的 (排序列值, activity_id)，连同排序列名编码进查询串；
+# 排序列变化后旧游标失效，回到第一页
+Cursor = Tuple[Any, str]
+
+
+def encode_cursor(column: str, value: Any, activity_id: str) -> str:
+    if isinstance(value, Decimal):
+        value = str(value)
+    raw = json.dumps([column, value, activity_id], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, column: str) -> Optional[Cursor]:
+    # 非法或与当前排序列不符的游标一律忽略
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        cursor_column, value, activity_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        return None
+    if cursor_column != column or not isinstance(activity_id, str):
+        return None
+    if value is None:
+        return (None, activity_id) if column in NULLABLE_METRICS else None
+    try:
+        # 按列类型还原参数，保证与索引列同类型比较
+        if METRIC_COLUMN_TYPES.get(column) == "NUMERIC":
+            return Decimal(str(value)), activity_id
+        if METRIC_COLUMN_TYPES.get(column) in ("BIGINT", "INTEGER"):
+            return int(value), activity_id
+    except (InvalidOperation, ValueError, TypeError):
+        return None
+    return str(value), activity_id
+
+
+@dataclass(frozen=True)
+class DashboardQuery:
+    platform: str
+    date_key: date
+    columns: Tuple[str, ...]
+    sort_column: str
+    descending: bool = True
+    q: str = ""
+    # 分类/类型过滤值，None 表示不过滤
+    membership: Optional[str] = None
+    limit: int = 200
+    # keyset 翻页：cursor 为上一页边界行；backward=True 表示取 cursor 之前的一页
+    cursor: Optional[Cursor] = None
+    backward: bool = False
+
+
+@dataclass(frozen=True)
+class DashboardPage:
+    rows: List[Tuple[Any, ...]]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+def _seek_sql(query: DashboardQuery, descending: bool, nulls_last: bool) -> Tuple[str, List[Any]]:
+    # 按扫描顺序取 cursor 之后的行；(排序列, activity_id) 行值比较可直接沿复合索引定位
+    column = query.sort_column
+    value, activity_id = query.cursor  # type: ignore[misc]
+    op = "<" if descending else ">"
+    if value is None:
+        if nulls_last:
+            return f"({column} IS NULL AND activity_id {op} %s)", [activity_id]
+        return f"({column} IS NOT NULL OR ({column} IS NULL AND activity_id {op} %s))", [activity_id]
+    seek = f"({column}, activity_id) {op} (%s, %s)"
+    if column in NULLABLE_METRICS and nulls_last:
+        seek = f"({seek} OR {column} IS NULL)"
+    return seek, [value, activity_id]
+
+
+def _filter_sql(query: DashboardQuery) -> Tuple[str, List[Any]]:
+    where_sql = "WHERE date_key = %s AND platform = %s"
+    params: List[Any] = [query.date_key, query.platform]
+    if query.q:
+        where_sql += " AND title ILIKE %s"
+        params.append(f"%{query.q}%")
+    if query.membership is not None:
+        where_sql += " AND " + MEMBERSHIP_FILTER_SQL
+        params.extend([query.membership, query.membership])
+    return where_sql, params
+
+
+def dashboard_sql(query: DashboardQuery) -> Tuple[str, List[Any]]:
+    where_sql, params = _filter_sql(query)
+    # 展示顺序为 排序列（空值在后）+ activity_id 同向；向前翻页时整体反向扫描，结果由调用方再反转
+    descending = query.descending != query.backward
+    nulls = "FIRST" if query.backward else "LAST"
+    if query.cursor is not None:
+        seek_sql, seek_params = _seek_sql(query, descending, nulls == "LAST")
+        where_sql += " AND " + seek_sql
+        params.extend(seek_params)
+    order_sql = "DESC" if descending else "ASC"
+    sort_sql = metric_order_sql(query.sort_column, order_sql, nulls)
+    # 末尾附带排序键用于生成游标；多取一行判断是否还有下一页
+    sql = f"""
+        SELECT {", ".join(query.columns)}, {query.sort_column}, activity_id
+        FROM activity_detail
+        {where_sql}
+        ORDER BY {sort_sql}, activity_id {order_sql}
+        LIMIT {int(query.limit) + 1}
+    """
+    return sql, params
+
+
+def dashboard_page(query: DashboardQuery, fetched: List[Tuple[Any, ...]]) -> DashboardPage:
+    # fetched 为 dashboard_sql 的结果（按扫描顺序，最多 limit + 1 行）
+    has_more = len(fetched) > query.limit
+    rows = fetched[:query.limit]
+    if query.backward:
+        rows.reverse()
+    has_next = has_more if not query.backward else True
+    has_prev = has_more if query.backward else query.cursor is not None
+    page = [row[:-2] for row in rows]
+    if not rows:
+        return DashboardPage(page)
+    first, last = rows[0], rows[-1]
+    return DashboardPage(
+        page,
+        next_cursor=encode_cursor(query.sort_column, last[-2], last[-1]) if has_next else None,
+        prev_cursor=encode_cursor(query.sort_column, first[-2], first[-1]) if has_prev else None,
+    )
+
+
+def export_sql(query: DashboardQuery) -> Tuple[str, List[Any]]:
+    # 与仪表板相同的过滤与排序，但不分页：导出接口从服务端游标流式读取全部结果
+    where_sql, params = _filter_sql(query)
+    order_sql = "DESC" if query.descending else "ASC"
+    sql = f"""
+        SELECT {", ".join(query.columns)}
+        FROM activity_detail
+        {where_sql}
+        ORDER BY {metric_order_sql(query.sort_column, order_sql)}, activity_id {order_sql}
+    """
+    return sql, params
+
+
+def trend_sql(platform: str, columns: Sequence[str], start: date, end: date, activity_id: str = "") -> Tuple[str, List[Any]]:
+    where_sql = "WHERE date_key >= %s AND date_key <= %s AND platform = %s"
+    params: List[Any] = [start, end, platform]
+    if activity_id:
+        where_sql += " AND activity_id = %s"
+        params.append(activity_id)
+    sql = f"""
+        SELECT {", ".join(columns)}
+        FROM activity_daily_rollup
+        {where_sql}
+        ORDER BY activity_id, date_key
+    """
+    return sql, params
+
+
+__all__ = [
+    "ACTIVITY_DOCUMENT_SQL",
+    "Cursor",
+    "DashboardPage",
+    "DashboardQuery",
+    "MEMBERSHIP_FILTER_SQL",
+    "dashboard_page",
+    "dashboard_sql",
+    "decode_cursor",
+    "encode_cursor",
+    "export_sql",
+    "metric_order_sql",
+    "trend_sql",
+]
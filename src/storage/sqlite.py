@@ -0,0 +1,394 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from ..db import DETAIL_COLUMNS, Database, DetailRow, WriteStats, ingest_in_chunks
+from ..partitions import add_months, month_start
+from ..platforms.common.raw_json import ActivityData
+from ..platforms.metrics import METRIC_COLUMN_TYPES, METRIC_COLUMNS, SORTABLE_METRICS
+from ..rollup import ROLLUP_COLUMNS
+from ..timing import phase
+from .base import ActivityReader
+
+
+# 单机/测试用的嵌入式后端：DATABASE_URL=sqlite:///relative.db 或 sqlite:////abs/path.db。
+# 表结构与 Postgres 相同（date_key 存 ISO 日期文本，activity_data 存经 json_valid 校验的 JSON 文本，可用 JSON1 函数查询），
+# 不支持分区、增量存储和 COPY，写入按批在一个事务内 executemany。
+SCHEMA_VERSION = 3
+_SQLITE_TYPES = {"TEXT": "TEXT", "BIGINT": "INTEGER", "INTEGER": "INTEGER", "NUMERIC": "REAL"}
+
+
+def is_sqlite_url(database_url: str) -> bool:
+    return database_url.startswith("sqlite:")
+
+
+def sqlite_path(database_url: str) -> str:
+    if not database_url.startswith("sqlite:///"):
+        raise ValueError(f"invalid sqlite url: {database_url}")
+    return database_url[len("sqlite:///"):]
+
+
+def connect(database_url: str) -> sqlite3.Connection:
+    # isolation_level=None：事务由调用方显式 BEGIN/COMMIT
+    conn = sqlite3.connect(sqlite_path(database_url), check_same_thread=False, isolation_level=None, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+def _bind(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _init_schema(conn: sqlite3.Connection) -> None:
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+    metric_defs = ",\n".join(f"{c} {_SQLITE_TYPES[METRIC_COLUMN_TYPES[c]]}" for c in METRIC_COLUMNS)
+    statements = [
+        f"""
+        CREATE TABLE IF NOT EXISTS activity_detail (
+            activity_id TEXT NOT NULL,
+            type TEXT NOT NULL,
+            date_key TEXT NOT NULL,
+            platform TEXT NOT NULL,
+            activity_data TEXT NOT NULL CHECK (json_valid(activity_data)),
+            content_hash TEXT,
+            storage_kind TEXT NOT NULL DEFAULT 'full',
+            base_date TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            {metric_defs},
+            PRIMARY KEY (activity_id, date_key, platform)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS activity_membership (
+            activity_id TEXT NOT NULL,
+            date_key TEXT NOT NULL,
+            platform TEXT NOT NULL,
+            type TEXT NOT NULL,
+            PRIMARY KEY (platform, date_key, activity_id, type)
+        )
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS activity_daily_rollup (
+            platform TEXT NOT NULL,
+            activity_id TEXT NOT NULL,
+            date_key TEXT NOT NULL,
+            {metric_defs},
+            updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (platform, date_key, activity_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS data_version (
+            platform TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS activity_detail_platform_date_idx ON activity_detail (platform, date_key)",
+        "CREATE INDEX IF NOT EXISTS activity_detail_platform_activity_date_idx ON activity_detail (platform, activity_id, date_key)",
+        "CREATE INDEX IF NOT EXISTS activity_daily_rollup_activity_idx ON activity_daily_rollup (platform, activity_id, date_key)",
+    ]
+    # SQLite 的索引定义不支持 NULLS LAST，可空列也建普通索引；activity_id 是 keyset 翻页的次排序键（v2）
+    for column in SORTABLE_METRICS:
+        statements.append(f"DROP INDEX IF EXISTS activity_detail_{column}_idx")
+        statements.append(
+            f"CREATE INDEX IF NOT EXISTS activity_detail_{column}_seek_idx "
+            f"ON activity_detail (platform, date_key, {column}, activity_id)"
+        )
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for statement in statements:
+            conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+_DETAIL_UPSERT_SQL = f"""
+    INSERT INTO activity_detail ({", ".join(DETAIL_COLUMNS)})
+    VALUES ({", ".join("?" for _ in DETAIL_COLUMNS)})
+    ON CONFLICT (activity_id, date_key, platform) DO UPDATE SET
+        {", ".join(f"{c} = excluded.{c}" for c in DETAIL_COLUMNS[4:])}
+"""
+
+_ROLLUP_UPDATES = ", ".join(f"{c} = excluded.{c}" for c in METRIC_COLUMNS)
+
+_ROLLUP_UPSERT_SQL = f"""
+    INSERT INTO activity_daily_rollup ({", ".join(ROLLUP_COLUMNS)})
+    VALUES ({", ".join("?" for _ in ROLLUP_COLUMNS)})
+    ON CONFLICT (platform, date_key, activity_id) DO UPDATE SET {_ROLLUP_UPDATES}, updated_at = CURRENT_TIMESTAMP
+"""
+
+
+@dataclass
+class SqliteDatabase:
+    conn: sqlite3.Connection
+    batch_size: int = 1
+    flush_interval_seconds: float = 5.0
+    _lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+    _pending: Dict[Tuple[str, str, str], DetailRow] = field(default_factory=dict, repr=False)
+    _pending_since: Optional[float] = field(default=None, repr=False)
+    _pending_membership: Set[Tuple[str, str, str, str]] = field(default_factory=set, repr=False)
+    _write_stats: Dict[str, WriteStats] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def open(
+        cls,
+        database_url: str,
+        batch_size: int = 1,
+        flush_interval_seconds: float = 5.0,
+        storage_mode: str = "full",
+    ) -> "SqliteDatabase":
+        log = logging.getLogger(__name__)
+        if storage_mode != "full":
+            log.warning("sqlite_storage_mode_unsupported mode=%s, storing full snapshots", storage_mode)
+        conn = connect(database_url)
+        _init_schema(conn)
+        log.info("db_open backend=sqlite path=%s", sqlite_path(database_url))
+        return cls(conn, batch_size=max(1, batch_size), flush_interval_seconds=flush_interval_seconds)
+
+    def save_activity_detail(self, activity_id: str, date_key: str, activity_data: ActivityData, type_text: str, platform: str) -> None:
+        row = Database._detail_row(activity_id, type_text, date_key, platform, activity_data)
+        with self._lock:
+            self._pending[(activity_id, date_key, platform)] = row
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            if (len(self._pending) >= self.batch_size
+                    or time.monotonic() - self._pending_since >= self.flush_interval_seconds):
+                self.flush()
+
+    def save_membership(self, activity_id: str, date_key: str, type_text: str, platform: str) -> None:
+        with self._lock:
+            self._pending_membership.add((activity_id, date_key, platform, type_text))
+
+    def _write_rows(self, rows: List[DetailRow]) -> Dict[str, WriteStats]:
+        # 先按主键取现有哈希分类（进程内查询，开销可忽略），只重写新增和内容变化的行
+        counts: Dict[str, WriteStats] = {}
+        written: List[Tuple[Any, ...]] = []
+        for row in rows:
+            bound = tuple(_bind(v) for v in row)
+            existing = self.conn.execute(
+                "SELECT content_hash FROM activity_detail WHERE activity_id = ? AND date_key = ? AND platform = ?",
+                (bound[0], bound[2], bound[3]),
+            ).fetchone()
+            stats = counts.setdefault(bound[3], WriteStats())
+            if existing is None:
+                stats.inserted += 1
+            elif existing[0] != bound[5]:
+                stats.changed += 1
+            else:
+                stats.unchanged += 1
+                continue
+            written.append(bound)
+        if written:
+            self.conn.executemany(_DETAIL_UPSERT_SQL, written)
+            metrics_at = len(DETAIL_COLUMNS) - len(METRIC_COLUMNS)
+            self.conn.executemany(_ROLLUP_UPSERT_SQL, [(r[3], r[0], r[2]) + r[metrics_at:] for r in written])
+        return counts
+
+    def _record_write_stats(self, counts: Dict[str, WriteStats]) -> WriteStats:
+        # 只在提交成功后累计：回滚重试的行不会被重复计数
+        batch = WriteStats()
+        for platform, counted in counts.items():
+            stats = self._write_stats.setdefault(platform, WriteStats())
+            stats.inserted += counted.inserted
+            stats.changed += counted.changed
+            stats.unchanged += counted.unchanged
+            batch.inserted += counted.inserted
+            batch.changed += counted.changed
+            batch.unchanged += counted.unchanged
+        return batch
+
+    def _transaction(self, work: Callable[[], Any]) -> Any:
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work()
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def flush(self) -> int:
+        log = logging.getLogger(__name__)
+        with self._lock:
+            if not self._pending and not self._pending_membership:
+                return 0
+            rows = list(self._pending.values())
+            memberships = list(self._pending_membership)
+            started = time.monotonic()
+
+            def work() -> Dict[str, WriteStats]:
+                counts = self._write_rows(rows)
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO activity_membership (activity_id, date_key, platform, type) VALUES (?, ?, ?, ?)",
+                    memberships,
+                )
+                return counts
+
+            try:
+                counts = self._transaction(work)
+            except Exception:
+                log.error("db_flush_failed rows=%s memberships=%s", len(rows), len(memberships))
+                raise
+            batch = self._record_write_stats(counts)
+            self._pending.clear()
+            self._pending_membership.clear()
+            self._pending_since = None
+            log.info(
+                "db_flush rows=%s inserted=%s changed=%s unchanged=%s memberships=%s elapsed_ms=%s",
+                len(rows), batch.inserted, batch.changed, batch.unchanged, len(memberships),
+                int((time.monotonic() - started) * 1000),
+            )
+            return len(rows)
+
+    def bulk_ingest(
+        self,
+        records: Iterable[Tuple[str, str, Any, str, ActivityData]],
+        chunk_size: int = 5000,
+        progress: Optional[Callable[[int, WriteStats, float], None]] = None,
+    ) -> WriteStats:
+        self.flush()
+
+        def write_chunk(rows: List[DetailRow]) -> WriteStats:
+            with self._lock:
+                return self._record_write_stats(self._transaction(lambda: self._write_rows(rows)))
+
+        return ingest_in_chunks(records, chunk_size, Database._detail_row, write_chunk, progress)
+
+    def refresh_rollup(self, since: date) -> int:
+        columns = ", ".join(ROLLUP_COLUMNS)
+        sql = f"""
+            INSERT INTO activity_daily_rollup ({columns})
+            SELECT {columns} FROM activity_detail WHERE date_key >= ?
+            ON CONFLICT (platform, date_key, activity_id) DO UPDATE SET {_ROLLUP_UPDATES}, updated_at = CURRENT_TIMESTAMP
+        """
+        with self._lock:
+            count = self._transaction(lambda: self.conn.execute(sql, (since.isoformat(),)).rowcount)
+        logging.getLogger(__name__).info("db_rollup_refresh since=%s rows=%s", since.isoformat(), count)
+        return count
+
+    def bump_data_version(self, platform: Optional[str] = None) -> None:
+        def work() -> None:
+            if platform is None:
+                self.conn.execute("UPDATE data_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP")
+            else:
+                self.conn.execute(
+                    "INSERT INTO data_version (platform, version) VALUES (?, 1) "
+                    "ON CONFLICT (platform) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP",
+                    (platform,),
+                )
+        with self._lock:
+            self._transaction(work)
+
+    def apply_retention(self, keep_months: int, drop: bool = False) -> List[str]:
+        # 没有分区，按日期删除；drop 参数与 Postgres 后端保持一致，这里总是删除
+        if keep_months < 1:
+            raise ValueError("keep_months must be >= 1")
+        before = add_months(month_start(date.today()), -(keep_months - 1)).isoformat()
+
+        def work() -> List[str]:
+            months = [r[0] for r in self.conn.execute(
+                "SELECT DISTINCT substr(date_key, 1, 7) FROM activity_detail WHERE date_key < ? ORDER BY 1", (before,)
+            )]
+            for table in ("activity_detail", "activity_membership", "activity_daily_rollup"):
+                self.conn.execute(f"DELETE FROM {table} WHERE date_key < ?", (before,))
+            return months
+
+        with self._lock:
+            expired = self._transaction(work)
+        logging.getLogger(__name__).info("db_retention keep_months=%s before=%s expired=%s", keep_months, before, len(expired))
+        return expired
+
+    def take_write_stats(self, platform: str) -> WriteStats:
+        with self._lock:
+            return self._write_stats.pop(platform, WriteStats())
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                if self._pending or self._pending_membership:
+                    logging.getLogger(__name__).error(
+                        "db_close_unflushed rows=%s memberships=%s", len(self._pending), len(self._pending_membership)
+                    )
+                self.conn.close()
+
+
+class SqliteReader(ActivityReader):
+    backend = "sqlite"
+
+    def __init__(self, database_url: str) -> None:
+        self._database_url = database_url
+        # sqlite3 连接不宜跨线程并发使用：每个请求线程一个连接，WAL 模式下读写互不阻塞
+        self._local = threading.local()
+        _init_schema(self._connection())
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect(self._database_url)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def translate(sql: str) -> str:
+        return sql.replace("%s", "?").replace(" ILIKE ", " LIKE ")
+
+    def execute(self, sql: str, params: Sequence[Any]) -> List[Tuple[Any, ...]]:
+        return list(self.iter_rows(sql, params))
+
+    def iter_rows(self, sql: str, params: Sequence[Any], itersize: int = 500) -> Iterator[Tuple[Any, ...]]:
+        # sqlite3 游标本身按步取行，fetchmany 分批即可保持内存恒定
+        with phase("connect"):
+            conn = self._connection()
+        with phase("execute"):
+            cur = conn.execute(self.translate(sql), [_bind(p) for p in params])
+        try:
+            date_columns = [i for i, d in enumerate(cur.description or ()) if d[0] == "date_key"]
+            while True:
+                with phase("fetch"):
+                    rows = cur.fetchmany(itersize)
+                if not rows:
+                    return
+                for row in rows:
+                    if not date_columns:
+                        yield row
+                        continue
+                    values = list(row)
+                    for i in date_columns:
+                        if isinstance(values[i], str):
+                            values[i] = date.fromisoformat(values[i])
+                    yield tuple(values)
+        finally:
+            cur.close()
+
+    def ping(self) -> None:
+        self._connection().execute("SELECT 1").fetchone()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "path": sqlite_path(self._database_url)}
+
+    def load_json(self, value: Any) -> Any:
+        return json.loads(value) if isinstance(value, str) else value
+
+
+__all__ = ["SqliteDatabase", "SqliteReader", "is_sqlite_url", "sqlite_path"]
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+import threading
+import time
+
+
+# 请求分阶段计时：读取端与路由在关键位置用 phase() 包住，未处于请求中（CLI、缓存后台刷新线程）时不计时
+PHASES = ("connect", "execute", "fetch", "transform", "render")
+
+# 直方图桶上限（秒），与 Prometheus 默认桶相近
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestTimer:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+_current: ContextVar[Optional[RequestTimer]] = ContextVar("request_timer", default=None)
+
+T = TypeVar("T")
+
+
+def start_timer() -> Tuple[RequestTimer, Token]:
+    timer = RequestTimer()
+    return timer, _current.set(timer)
+
+
+def reset_timer(token: Token) -> None:
+    _current.reset(token)
+
+
+def record_phase(name: str, seconds: float) -> None:
+    timer = _current.get()
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+def bind_timer(timer: RequestTimer, chunks: Iterable[T]) -> Iterator[T]:
+    # 流式响应的正文在请求钩子（含 teardown）之后才迭代：每取一块时临时恢复计时器，读取端的 phase() 仍计入本请求
+    it = iter(chunks)
+    try:
+        while True:
+            token = _current.set(timer)
+            try:
+                chunk = next(it)
+            except StopIteration:
+                return
+            finally:
+                _current.reset(token)
+            yield chunk
+    finally:
+        close = getattr(it, "close", None)
+        if close is not None:
+            close()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+
+class LatencyHistograms:
+    # 按路由累计的请求耗时直方图与各阶段耗时总和，/metrics 以 Prometheus 文本格式输出
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counts: Dict[str, List[int]] = {}
+        self._sums: Dict[str, float] = {}
+        self._phase_sums: Dict[Tuple[str, str], float] = {}
+
+    def observe(self, route: str, seconds: float, phases: Dict[str, float]) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(route, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._sums[route] = self._sums.get(route, 0.0) + seconds
+            for name, value in phases.items():
+                self._phase_sums[(route, name)] = self._phase_sums.get((route, name), 0.0) + value
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            for route in sorted(self._counts):
+                counts = self._counts[route]
+                label = _label(route)
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f'http_request_duration_seconds_bucket{{route="{label}",le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{route="{label}",le="+Inf"}} {counts[-1]}')
+                lines.append(f'http_request_duration_seconds_sum{{route="{label}"}} {self._sums[route]:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{route="{label}"}} {counts[-1]}')
+            lines.append("# HELP http_request_phase_seconds_total Time spent per request phase by route.")
+            lines.append("# TYPE http_request_phase_seconds_total counter")
+            for (route, name), value in sorted(self._phase_sums.items()):
+                lines.append(f'http_request_phase_seconds_total{{route="{_label(route)}",phase="{name}"}} {value:.6f}')
+        return "\n".join(lines) + "\n"
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def server_timing(timer: RequestTimer, total: float) -> str:
+    parts = [f"{name};dur={timer.phases[name] * 1000:.1f}" for name in PHASES if name in timer.phases]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+__all__ = ["LATENCY_BUCKETS", "LatencyHistograms", "PHASES", "RequestTimer", "bind_timer", "phase", "record_phase", "reset_timer", "server_timing", "start_timer"]
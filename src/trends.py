@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from operator import itemgetter
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+
+# 趋势页读取的汇总表列（顺序即返回元组的顺序）
+TREND_COLUMNS = {
+    "gaia": ("activity_id", "title", "date_key", "min_price", "max_price", "min_size", "max_size", "surplus_size", "times_count"),
+    "tiga": ("activity_id", "title", "date_key", "collect_count", "comment_count", "comment_average",
+             "one_week_uv", "two_month_uv", "history_signup_count"),
+}
+
+# 页面上的维度参数 -> 汇总表列（顺序即默认展示的维度）
+TREND_DIMENSIONS: Dict[str, Dict[str, str]] = {
+    "gaia": {
+        "detail.minPrice": "min_price",
+        "detail.maxPrice": "max_price",
+        "detail.minSize": "min_size",
+        "detail.maxSize": "max_size",
+        "detail.surplusSize": "surplus_size",
+        "times.count": "times_count",
+    },
+    "tiga": {
+        "collect_count": "collect_count",
+        "total_comment.count": "comment_count",
+        "total_comment.average": "comment_average",
+        "activityType.one_week_uv": "one_week_uv",
+        "activityType.two_month_uv": "two_month_uv",
+        "activityType.history_signup_count": "history_signup_count",
+    },
+}
+
+# 降采样后每条序列至少保留首尾和一个中间点
+MIN_POINTS = 3
+
+
+def _number(value: Any) -> Any:
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def lttb_indices(ys: Sequence[float], threshold: int) -> List[int]:
+    # Largest-Triangle-Three-Buckets：x 为下标，每个桶保留与前一选中点、后一桶均值构成三角形面积最大的点，峰谷得以保留
+    n = len(ys)
+    if threshold >= n or threshold < MIN_POINTS:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    picked = [0]
+    a = 0
+    for bucket in range(threshold - 2):
+        avg_start = int((bucket + 1) * every) + 1
+        avg_end = min(int((bucket + 2) * every) + 1, n)
+        avg_x = (avg_start + avg_end - 1) / 2
+        avg_y = sum(ys[avg_start:avg_end]) / (avg_end - avg_start)
+        ay = ys[a]
+        best, best_area = -1, -1.0
+        for j in range(int(bucket * every) + 1, int((bucket + 1) * every) + 1):
+            area = abs((a - avg_x) * (ys[j] - ay) - (a - j) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        a = best
+    picked.append(n - 1)
+    return picked
+
+
+def compact_series(values: List[Any], max_points: Optional[int]) -> Dict[str, List[Any]]:
+    # 列式序列：{"v": 值}；有缺失值或降采样时附带 {"i": 在 dates 中的下标}
+    present = [i for i, v in enumerate(values) if v is not None]
+    if len(present) == len(values) and (not max_points or len(values) <= max_points):
+        return {"v": values}
+    if max_points and len(present) > max_points:
+        ys = [values[i] for i in present]
+        present = [present[k] for k in lttb_indices(ys, max_points)]
+    return {"i": present, "v": [values[i] for i in present]}
+
+
+def pivot(
+    rows: Sequence[Tuple[Any, ...]],
+    columns: Sequence[str],
+    dimensions: Mapping[str, str],
+    max_points: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """把 (activity_id, ..., date_key, 指标...) 行转成按活动分组的列式序列。
+
+    先整体转置成列，再按 activity_id 分段切片，每个维度一次列表切片，不逐行逐维度处理。
+    """
+    if not rows:
+        return []
+    # 归档部分与数据库部分各自按 (activity_id, date_key) 有序，稳定排序后同一活动的日期仍然递增
+    ordered = sorted(rows, key=itemgetter(columns.index("activity_id")))
+    by_column = dict(zip(columns, zip(*ordered)))
+    ids = by_column["activity_id"]
+    titles = by_column["title"]
+    dates = [d.isoformat() for d in by_column["date_key"]]
+    values = {c: [_number(v) for v in by_column[c]] for c in set(dimensions.values())}
+
+    starts = [0] + [i for i in range(1, len(ids)) if ids[i] != ids[i - 1]]
+    ends = starts[1:] + [len(ids)]
+    return [
+        {
+            "activity_id": ids[start],
+            "title": titles[start] or "",
+            "dates": dates[start:end],
+            "series": {dim: compact_series(values[column][start:end], max_points) for dim, column in dimensions.items()},
+        }
+        for start, end in zip(starts, ends)
+    ]
+
+
+__all__ = ["MIN_POINTS", "TREND_COLUMNS", "TREND_DIMENSIONS", "compact_series", "lttb_indices", "pivot"]
@@ -1,53 +1,252 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+import hmac
 import logging
+import threading
 
-from flask import Flask, request, render_template, redirect, url_for, session
-import psycopg
+from flask import Flask, Response, jsonify, request, render_template, redirect, url_for, session, stream_with_context
 
+from .archive import archive_boundary, archived_months, iter_archived_rows, read_archived_rows
+from .export import EXPORT_FORMATS, encode_chunks, serialize
+from .instrumentation import instrument
+from .partitions import add_months, month_start
 from .platforms.common.config import BaseConfig
+from .result_cache import ResultCache
+from .timing import LatencyHistograms, phase
+from .trends import MIN_POINTS, TREND_COLUMNS, TREND_DIMENSIONS, pivot
+from .storage import ActivityReader, DashboardQuery, decode_cursor, open_reader
 
 
 app = Flask(__name__)
 log = logging.getLogger(__name__)
 
 
-def pg_connect():
-    cfg = BaseConfig.from_env()
-    app.config.setdefault('SECRET_KEY', cfg.secret_key)
-    return psycopg.connect(cfg.database_url)
-
-
-def query_with_param(params: Dict[str, str], key: str, value: str) -> str:
-    new_params = params.copy()
+def date_arg(name: str, default: date) -> date:
+    # date_key 是 DATE 分区键：按日期类型传参才能分区裁剪，非法输入回退默认值
+    raw = request.args.get(name, "").strip()
+    try:
+        return date.fromisoformat(raw) if raw else default
+    except ValueError:
+        return default
+
+
+def trend_args(platform: str) -> Tuple[List[str], Optional[int]]:
+    # 返回 (维度列表, 每条序列最多点数)；未知维度忽略，max_points 缺省或非法时不降采样
+    known = TREND_DIMENSIONS[platform]
+    dimensions = [d for d in request.args.getlist("dimensions") if d in known] or list(known)
+    try:
+        max_points = int(request.args.get("max_points", ""))
+    except ValueError:
+        max_points = None
+    if max_points is not None and max_points < MIN_POINTS:
+        max_points = None
+    return dimensions, max_points
+
+
+# 仪表板每页行数；翻页用 after/before 游标（见 storage.queries.encode_cursor）
+DASHBOARD_PAGE_SIZE = 200
+
+
+def cursor_args(sort_column: str) -> Tuple[Optional[Tuple[Any, str]], bool]:
+    # 返回 (游标, 是否向前翻)；before 优先，游标与当前排序列不符时回到第一页
+    before = decode_cursor(request.args.get("before", ""), sort_column)
+    if before is not None:
+        return before, True
+    return decode_cursor(request.args.get("after", ""), sort_column), False
+
+
+# 仪表板与导出接口共用的排序参数 -> 类型化指标列（第一个为默认排序）
+SORT_COLUMNS = {
+    "tiga": {
+        "collect_count": "collect_count",
+        "total_comment.count": "comment_count",
+        "total_comment.average": "comment_average",
+        "activityType.one_week_uv": "one_week_uv",
+        "activityType.two_month_uv": "two_month_uv",
+        "activityType.history_signup_count": "history_signup_count",
+    },
+    "gaia": {
+        "detail.minPrice": "min_price",
+        "detail.maxPrice": "max_price",
+        "detail.minSize": "min_size",
+        "detail.maxSize": "max_size",
+        "times.count": "times_count",
+    },
+}
+
+# 导出接口输出的明细列
+EXPORT_COLUMNS = {
+    "tiga": ("activity_id", "date_key", "type", "title", "collect_count", "comment_count", "comment_average",
+             "one_week_uv", "two_month_uv", "history_signup_count"),
+    "gaia": ("activity_id", "date_key", "type", "title", "min_price", "max_price", "min_size", "max_size",
+             "surplus_size", "times_count"),
+}
+
+
+def sort_arg(platform: str, default: str) -> Tuple[str, str]:
+    # 返回 (排序参数, 指标列)；未知参数按默认排序
+    sort = request.args.get("sort", default)
+    columns = SORT_COLUMNS[platform]
+    return sort, columns.get(sort, columns[default])
+
+
+def membership_arg(platform: str) -> Optional[str]:
+    # tiga 按 type（domestic/overseas）过滤，gaia 按 catalog 过滤；all 或非法值表示不过滤
+    if platform == "tiga":
+        value = request.args.get("type", "all")
+        return value if value in ("domestic", "overseas") else None
+    value = request.args.get("catalog", "all")
+    return value if value != "all" else None
+
+
+def trend_segments(platform: str, start: date, end: date) -> List[Tuple[bool, date, date]]:
+    # 按月拆分 [start, end]，返回按日期先后排列的 (是否读归档, 起, 止)：
+    # 只有保留窗口之前且已有归档文件的月份读 Parquet，其余月份（包括窗口外尚未归档、仍在汇总表中的月份）查汇总表
+    cfg = web_config()
+    boundary = archive_boundary(cfg.retention_months) if cfg.archive_dir else None
+    if boundary is None or start >= boundary:
+        return [(False, start, end)]
+    archived = set(archived_months(cfg.archive_dir, platform))
+    segments: List[Tuple[bool, date, date]] = []
+    month = month_start(start)
+    while month <= end:
+        following = add_months(month, 1)
+        from_archive = month < boundary and month in archived
+        seg_start, seg_end = max(start, month), min(end, following - timedelta(days=1))
+        if segments and segments[-1][0] == from_archive:
+            segments[-1] = (from_archive, segments[-1][1], seg_end)
+        else:
+            segments.append((from_archive, seg_start, seg_end))
+        month = following
+    return segments
+
+
+def fetch_trend_rows(platform: str, start: date, end: date, activity_id: str = "") -> List[Any]:
+    # 各段按日期先后拼接，pivot 按 activity_id 稳定排序后同一活动的日期仍然递增
+    columns = TREND_COLUMNS[platform]
+    rows: List[Any] = []
+    for from_archive, seg_start, seg_end in trend_segments(platform, start, end):
+        if from_archive:
+            rows.extend(read_archived_rows(web_config().archive_dir, platform, columns, seg_start, seg_end, activity_id or None))
+        else:
+            rows.extend(get_reader().trend_rows(platform, columns, seg_start, seg_end, activity_id))
+    return rows
+
+
+def iter_trend_rows(platform: str, start: date, end: date, activity_id: str = "") -> Iterator[Tuple[Any, ...]]:
+    # 导出接口用的流式版本：归档逐月读取，数据库部分走服务端游标
+    columns = TREND_COLUMNS[platform]
+    for from_archive, seg_start, seg_end in trend_segments(platform, start, end):
+        if from_archive:
+            yield from iter_archived_rows(web_config().archive_dir, platform, columns, seg_start, seg_end, activity_id or None)
+        else:
+            yield from get_reader().iter_trend_rows(platform, columns, seg_start, seg_end, activity_id)
+
+
+@lru_cache(maxsize=1)
+def web_config() -> BaseConfig:
+    # 进程内只读取一次 .env / 环境变量
+    return BaseConfig.from_env()
+
+
+_reader: Optional[ActivityReader] = None
+_reader_lock = threading.Lock()
+
+
+def get_reader() -> ActivityReader:
+    # 按 DATABASE_URL 选择 Postgres（连接池）或 SQLite 后端，进程内共享
+    global _reader
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:
+                app.config.setdefault('SECRET_KEY', web_config().secret_key)
+                _reader = open_reader(web_config())
+    return _reader
+
+
+_result_cache: Optional[ResultCache] = None
+T = TypeVar("T")
+
+
+def get_result_cache() -> ResultCache:
+    global _result_cache
+    if _result_cache is None:
+        with _reader_lock:
+            if _result_cache is None:
+                cfg = web_config()
+                _result_cache = ResultCache(
+                    lambda: get_reader().data_versions(),
+                    ttl_seconds=cfg.web_cache_ttl_seconds,
+                    stale_seconds=cfg.web_cache_stale_seconds,
+                    max_entries=cfg.web_cache_max_entries,
+                    version_check_seconds=cfg.web_cache_version_check_seconds,
+                )
+    return _result_cache
+
+
+def cached(route: str, platform: str, params: Any, compute: Callable[[], T]) -> T:
+    # params 用解析后的查询对象/元组而不是原始查询串，默认值与无关参数不会产生不同的键；
+    # compute 可能在后台线程执行，不能访问 request
+    return get_result_cache().get(route, params, platform, compute)
+
+
+def query_with_param(params: Dict[str, str], key: str, value: str, drop: Tuple[str, ...] = ()) -> str:
+    new_params = {k: v for k, v in params.items() if k not in drop}
     new_params[key] = value
     return "&".join(f"{k}={v}" for k, v in new_params.items())
 
 
 @app.template_global()
-def query_with(key: str, value: str) -> str:
-    return query_with_param(dict(request.args.items()), key, value)
+def query_with(key: str, value: str, *drop: str) -> str:
+    # drop 中的参数不带入新链接，例如切换排序时丢弃翻页游标
+    return query_with_param(dict(request.args.items()), key, value, drop)
 
 
 def _require_login():
-    cfg = BaseConfig.from_env()
+    cfg = web_config()
     if not cfg.web_username or not cfg.web_password:
         return True
     return session.get("authed") is True
 
 
+def _profiling_allowed() -> bool:
+    # ?__profile 需显式开启 WEB_PROFILING，且仍要求登录
+    return web_config().web_profiling and _require_login()
+
+
+def _metrics_allowed() -> bool:
+    # 配置了 WEB_METRICS_TOKEN 时按 Bearer 令牌校验（供 Prometheus 采集），否则与其他页面一样要求登录
+    token = web_config().web_metrics_token
+    if token:
+        header = request.headers.get("Authorization", "")
+        return hmac.compare_digest(header.encode("utf-8"), f"Bearer {token}".encode("utf-8"))
+    return _require_login()
+
+
+# 每个请求按阶段计时（connect/execute/fetch/transform/render），输出 Server-Timing 头与 request_timing 日志
+latency_histograms = LatencyHistograms()
+instrument(app, latency_histograms, _profiling_allowed)
+
+
+def render_page(template_name: str, **context: Any) -> str:
+    with phase("render"):
+        return render_template(template_name, **context)
+
+
 @app.route("/login", methods=["GET", "POST"])
 def login():
-    cfg = BaseConfig.from_env()
+    cfg = web_config()
     if request.method == "POST":
         username = request.form.get("username", "")
         password = request.form.get("password", "")
         if cfg.web_username and cfg.web_password and username == cfg.web_username and password == cfg.web_password:
             session["authed"] = True
             return redirect(url_for("platform_select"))
-        return render_template("login.html", error="账号或密码错误")
-    return render_template("login.html")
+        return render_page("login.html", error="账号或密码错误")
+    return render_page("login.html")
 
 
 @app.route("/logout")
@@ -60,8 +259,8 @@ def logout():
 def platform_select():
     if not _require_login():
         return redirect(url_for("login"))
-    cfg = BaseConfig.from_env()
-    return render_template("platform_select.html",
+    cfg = web_config()
+    return render_page("platform_select.html",
                          tiga_display_name=cfg.tiga_display_name,
                          gaia_display_name=cfg.gaia_display_name)
 
@@ -72,78 +271,55 @@ def tiga_dashboard():
         return redirect(url_for("login"))
     from datetime import date as _date
     q = request.args.get("q", "").strip()
-    sort = request.args.get("sort", "collect_count")
+    sort, sort_column = sort_arg("tiga", "collect_count")
     order = request.args.get("order", "desc")
-    date_key = request.args.get("date", _date.today().isoformat())
+    date_key = date_arg("date", _date.today())
     type_filter = request.args.get("type", "all")
-    order_sql = "DESC" if order != "asc" else "ASC"
-
-    # 排序字段映射到 JSON 路径
-    sort_map = {
-        "collect_count": "COALESCE(NULLIF(activity_data->>'collect_count','')::numeric,0)",
-        "total_comment.count": "COALESCE(NULLIF(activity_data->'total_comment'->>'count','')::numeric,0)",
-        "total_comment.average": "NULLIF(activity_data->'total_comment'->>'average','')::numeric",
-        "activityType.one_week_uv": "COALESCE(NULLIF(activity_data->'activity_times'->'times'->0->'status'->'activityType'->>'one_week_uv','')::numeric,0)",
-        "activityType.two_month_uv": "COALESCE(NULLIF(activity_data->'activity_times'->'times'->0->'status'->'activityType'->>'two_month_uv','')::numeric,0)",
-        "activityType.history_signup_count": "COALESCE(NULLIF(activity_data->'activity_times'->'times'->0->'status'->'activityType'->>'history_signup_count','')::numeric,0)",
-    }
 
-    sort_sql = sort_map.get(sort, sort_map["collect_count"]) + f" {order_sql} NULLS LAST"
-
-    where_sql = "WHERE date_key = %s AND platform = %s"
-    params: List[Any] = [date_key, "tiga"]
-    if q:
-        where_sql += " AND activity_data->>'title' ILIKE %s"
-        params.append(f"%{q}%")
-    if type_filter in ("domestic", "overseas"):
-        where_sql += " AND type = %s"
-        params.append(type_filter)
-
-    sql = f"""
-        SELECT activity_id,
-               date_key,
-               platform,
-               activity_data->>'title'               AS title,
-               COALESCE(NULLIF(activity_data->>'collect_count','')::int, 0) AS collect_count,
-               COALESCE(NULLIF(activity_data->'total_comment'->>'count','')::int, 0) AS total_comment_count,
-               NULLIF(activity_data->'total_comment'->>'average','')::numeric AS total_comment_average,
-               COALESCE(NULLIF(activity_data->'activity_times'->'times'->0->'status'->'activityType'->>'one_week_uv','')::int, 0) AS one_week_uv,
-               COALESCE(NULLIF(activity_data->'activity_times'->'times'->0->'status'->'activityType'->>'two_month_uv','')::int, 0) AS two_month_uv,
-               COALESCE(NULLIF(activity_data->'activity_times'->'times'->0->'status'->'activityType'->>'history_signup_count','')::int, 0) AS history_signup_count
-        FROM activity_detail
-        {where_sql}
-        ORDER BY {sort_sql}
-        LIMIT 200
-    """
-
-    with pg_connect() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, params)
-            rows = [
-                {
-                    "activity_id": r[0],
-                    "date_key": r[1],
-                    "platform": r[2],
-                    "title": r[3] or "",
-                    "collect_count": r[4] or 0,
-                    "total_comment_count": r[5] or 0,
-                    "total_comment_average": float(r[6]) if r[6] is not None else None,
-                    "one_week_uv": r[7] or 0,
-                    "two_month_uv": r[8] or 0,
-                    "history_signup_count": r[9] or 0,
-                }
-                for r in cur.fetchall()
-            ]
-
-    cfg = BaseConfig.from_env()
-    return render_template(
+    cursor, backward = cursor_args(sort_column)
+    query = DashboardQuery(
+        platform="tiga",
+        date_key=date_key,
+        columns=("activity_id", "date_key", "platform", "title", "collect_count", "comment_count",
+                 "comment_average", "one_week_uv", "two_month_uv", "history_signup_count"),
+        sort_column=sort_column,
+        descending=order != "asc",
+        q=q,
+        membership=membership_arg("tiga"),
+        limit=DASHBOARD_PAGE_SIZE,
+        cursor=cursor,
+        backward=backward,
+    )
+    page = cached("dashboard", query.platform, query, lambda: get_reader().dashboard_page(query))
+
+    with phase("transform"):
+        rows = [
+            {
+                "activity_id": r[0],
+                "date_key": r[1].isoformat(),
+                "platform": r[2],
+                "title": r[3] or "",
+                "collect_count": r[4] or 0,
+                "total_comment_count": r[5] or 0,
+                "total_comment_average": float(r[6]) if r[6] is not None else None,
+                "one_week_uv": r[7] or 0,
+                "two_month_uv": r[8] or 0,
+                "history_signup_count": r[9] or 0,
+            }
+            for r in page.rows
+        ]
+
+    cfg = web_config()
+    return render_page(
         "tiga_dashboard.html",
         rows=rows,
         q=q,
         sort=sort,
         order=order,
-        date_key=date_key,
+        date_key=date_key.isoformat(),
         type_filter=type_filter,
+        next_cursor=page.next_cursor,
+        prev_cursor=page.prev_cursor,
         tiga_display_name=cfg.tiga_display_name,
         sort_options={
             "collect_count": "收藏人数",
@@ -162,31 +338,26 @@ def gaia_dashboard():
         return redirect(url_for("login"))
     from datetime import date as _date
     q = request.args.get("q", "").strip()
-    sort = request.args.get("sort", "detail.minPrice")
+    sort, sort_column = sort_arg("gaia", "detail.minPrice")
     order = request.args.get("order", "desc")
-    date_key = request.args.get("date", _date.today().isoformat())
+    date_key = date_arg("date", _date.today())
     catalog_filter = request.args.get("catalog", "all")
-    order_sql = "DESC" if order != "asc" else "ASC"
-
-    # Gaia 平台的排序字段映射
-    sort_map = {
-        "detail.minPrice": "COALESCE(NULLIF(activity_data->'detail'->>'minPrice','')::numeric,0)",
-        "detail.maxPrice": "COALESCE(NULLIF(activity_data->'detail'->>'maxPrice','')::numeric,0)",
-        "detail.minSize": "COALESCE(NULLIF(activity_data->'detail'->>'minSize','')::numeric,0)",
-        "detail.maxSize": "COALESCE(NULLIF(activity_data->'detail'->>'maxSize','')::numeric,0)",
-        "times.count": "COALESCE(jsonb_array_length(activity_data->'times'), 0)",
-    }
 
-    sort_sql = sort_map.get(sort, sort_map["detail.minPrice"]) + f" {order_sql} NULLS LAST"
-
-    where_sql = "WHERE date_key = %s AND platform = %s"
-    params: List[Any] = [date_key, "gaia"]
-    if q:
-        where_sql += " AND activity_data->'detail'->>'heading' ILIKE %s"
-        params.append(f"%{q}%")
-    if catalog_filter != "all":
-        where_sql += " AND type = %s"
-        params.append(catalog_filter)
+    cursor, backward = cursor_args(sort_column)
+    query = DashboardQuery(
+        platform="gaia",
+        date_key=date_key,
+        columns=("activity_id", "date_key", "platform", "type", "title", "min_price", "max_price",
+                 "min_size", "max_size", "surplus_size", "times_count"),
+        sort_column=sort_column,
+        descending=order != "asc",
+        q=q,
+        membership=membership_arg("gaia"),
+        limit=DASHBOARD_PAGE_SIZE,
+        cursor=cursor,
+        backward=backward,
+    )
+    page = cached("dashboard", query.platform, query, lambda: get_reader().dashboard_page(query))
 
     # Gaia 分类名称映射
     catalog_names = {
@@ -194,54 +365,36 @@ def gaia_dashboard():
         "S": "短途旅行", "WE": "城市活动", "SY": "青春系列"
     }
 
-    sql = f"""
-        SELECT activity_id,
-               date_key,
-               platform,
-               type,
-               activity_data->'detail'->>'heading' AS title,
-               COALESCE(NULLIF(activity_data->'detail'->>'minPrice','')::numeric, 0) AS min_price,
-               COALESCE(NULLIF(activity_data->'detail'->>'maxPrice','')::numeric, 0) AS max_price,
-               COALESCE(NULLIF(activity_data->'detail'->>'minSize','')::int, 0) AS min_size,
-               COALESCE(NULLIF(activity_data->'detail'->>'maxSize','')::int, 0) AS max_size,
-               COALESCE(NULLIF(activity_data->'detail'->>'surplusSize','')::int, 0) AS surplus_size,
-               COALESCE(jsonb_array_length(activity_data->'times'), 0) AS times_count
-        FROM activity_detail
-        {where_sql}
-        ORDER BY {sort_sql}
-        LIMIT 200
-    """
-
-    with pg_connect() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, params)
-            rows = [
-                {
-                    "activity_id": r[0],
-                    "date_key": r[1],
-                    "platform": r[2],
-                    "catalog": r[3],
-                    "catalog_name": catalog_names.get(r[3], r[3]),
-                    "title": r[4] or "",
-                    "min_price": float(r[5]) if r[5] is not None else 0,
-                    "max_price": float(r[6]) if r[6] is not None else 0,
-                    "min_size": r[7] or 0,
-                    "max_size": r[8] or 0,
-                    "surplus_size": r[9] or 0,
-                    "times_count": r[10] or 0,
-                }
-                for r in cur.fetchall()
-            ]
-
-    cfg = BaseConfig.from_env()
-    return render_template(
+    with phase("transform"):
+        rows = [
+            {
+                "activity_id": r[0],
+                "date_key": r[1].isoformat(),
+                "platform": r[2],
+                "catalog": r[3],
+                "catalog_name": catalog_names.get(r[3], r[3]),
+                "title": r[4] or "",
+                "min_price": float(r[5]) if r[5] is not None else 0,
+                "max_price": float(r[6]) if r[6] is not None else 0,
+                "min_size": r[7] or 0,
+                "max_size": r[8] or 0,
+                "surplus_size": r[9] or 0,
+                "times_count": r[10] or 0,
+            }
+            for r in page.rows
+        ]
+
+    cfg = web_config()
+    return render_page(
         "gaia_dashboard.html",
         rows=rows,
         q=q,
         sort=sort,
         order=order,
-        date_key=date_key,
+        date_key=date_key.isoformat(),
         catalog_filter=catalog_filter,
+        next_cursor=page.next_cursor,
+        prev_cursor=page.prev_cursor,
         gaia_display_name=cfg.gaia_display_name,
         sort_options={
             "detail.minPrice": "最低价格",
@@ -263,76 +416,27 @@ def gaia_trends():
     end_date = _date.today()
     start_date = end_date - timedelta(days=6)
 
-    start_date_str = request.args.get("start_date", start_date.isoformat())
-    end_date_str = request.args.get("end_date", end_date.isoformat())
+    start_date = date_arg("start_date", start_date)
+    end_date = date_arg("end_date", end_date)
     activity_id = request.args.get("activity_id", "").strip()
-    dimensions = request.args.getlist("dimensions") or [
-        "detail.minPrice", "detail.maxPrice", "detail.minSize", "detail.maxSize", "detail.surplusSize", "times.count"
-    ]
-
-    where_sql = "WHERE date_key >= %s AND date_key <= %s AND platform = %s"
-    params = [start_date_str, end_date_str, "gaia"]
-
-    if activity_id:
-        where_sql += " AND activity_id = %s"
-        params.append(activity_id)
-
-    sql = f"""
-        SELECT activity_id,
-               activity_data->'detail'->>'heading' AS title,
-               date_key,
-               COALESCE(NULLIF(activity_data->'detail'->>'minPrice','')::numeric, 0) AS min_price,
-               COALESCE(NULLIF(activity_data->'detail'->>'maxPrice','')::numeric, 0) AS max_price,
-               COALESCE(NULLIF(activity_data->'detail'->>'minSize','')::int, 0) AS min_size,
-               COALESCE(NULLIF(activity_data->'detail'->>'maxSize','')::int, 0) AS max_size,
-               COALESCE(NULLIF(activity_data->'detail'->>'surplusSize','')::int, 0) AS surplus_size,
-               COALESCE(jsonb_array_length(activity_data->'times'), 0) AS times_count
-        FROM activity_detail
-        {where_sql}
-        ORDER BY activity_id, date_key
-    """
-
-    with pg_connect() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, params)
-            rows = [
-                {
-                    "activity_id": r[0],
-                    "title": r[1] or "",
-                    "date_key": r[2],
-                    "min_price": float(r[3]) if r[3] is not None else 0,
-                    "max_price": float(r[4]) if r[4] is not None else 0,
-                    "min_size": r[5] or 0,
-                    "max_size": r[6] or 0,
-                    "surplus_size": r[7] or 0,
-                    "times_count": r[8] or 0,
-                }
-                for r in cur.fetchall()
-            ]
-
-    # 组织数据按activity_id分组
-    trend_data = {}
-    for row in rows:
-        aid = row["activity_id"]
-        if aid not in trend_data:
-            trend_data[aid] = {
-                "title": row["title"],
-                "activity_id": aid,
-                "dates": [],
-                "data": {dim: [] for dim in dimensions}
-            }
+    dimensions, max_points = trend_args("gaia")
+
+    # 分组与降采样后的列式结果一并缓存：同一范围与参数的重复访问不再转换
+    def compute() -> List[Dict[str, Any]]:
+        rows = fetch_trend_rows("gaia", start_date, end_date, activity_id)
+        selected = {d: TREND_DIMENSIONS["gaia"][d] for d in dimensions}
+        with phase("transform"):
+            return pivot(rows, TREND_COLUMNS["gaia"], selected, max_points)
 
-        trend_data[aid]["dates"].append(row["date_key"])
-        for dim in dimensions:
-            key = dim.replace("detail.", "").replace("times.", "times_")
-            trend_data[aid]["data"][dim].append(row.get(key, 0))
+    trend_data = cached("gaia_trends", "gaia", (start_date, end_date, activity_id, tuple(dimensions), max_points), compute)
 
-    cfg = BaseConfig.from_env()
-    return render_template(
+    cfg = web_config()
+    return render_page(
         "gaia_trends.html",
-        trend_data=list(trend_data.values()),
-        start_date=start_date_str,
-        end_date=end_date_str,
+        trend_data=trend_data,
+        max_points=max_points or "",
+        start_date=start_date.isoformat(),
+        end_date=end_date.isoformat(),
         activity_id=activity_id,
         dimensions=dimensions,
         gaia_display_name=cfg.gaia_display_name,
@@ -352,36 +456,26 @@ def gaia_activity_detail(activity_id: str):
     if not _require_login():
         return redirect(url_for("login"))
     from datetime import date as _date
-    date_key = request.args.get("date", _date.today().isoformat())
-
-    sql = """
-        SELECT activity_data, type
-        FROM activity_detail
-        WHERE activity_id = %s AND date_key = %s AND platform = %s
-        LIMIT 1
-    """
-
-    with pg_connect() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, (activity_id, date_key, "gaia"))
-            row = cur.fetchone()
-            if not row:
-                cfg = BaseConfig.from_env()
-                return render_template("gaia_activity_detail.html",
-                                      title="未找到数据",
-                                      activity_id=activity_id,
-                                      date_key=date_key,
-                                      catalog_name="",
-                                      gaia_display_name=cfg.gaia_display_name,
-                                      min_price=None,
-                                      max_price=None,
-                                      min_size=None,
-                                      max_size=None,
-                                      surplus_size=None,
-                                      times=[],
-                                      times_count=0)
-
-            activity_data, catalog = row
+    date_key = date_arg("date", _date.today())
+
+    found = get_reader().activity_document("gaia", activity_id, date_key)
+    if found is None:
+        cfg = web_config()
+        return render_page("gaia_activity_detail.html",
+                              title="未找到数据",
+                              activity_id=activity_id,
+                              date_key=date_key.isoformat(),
+                              catalog_name="",
+                              gaia_display_name=cfg.gaia_display_name,
+                              min_price=None,
+                              max_price=None,
+                              min_size=None,
+                              max_size=None,
+                              surplus_size=None,
+                              times=[],
+                              times_count=0)
+
+    activity_data, catalog = found
 
     # Gaia 分类名称映射
     catalog_names = {
@@ -416,12 +510,12 @@ def gaia_activity_detail(activity_id: str):
                 "surplus_size": trip.get("surplusSize", 0),
             })
 
-    cfg = BaseConfig.from_env()
-    return render_template(
+    cfg = web_config()
+    return render_page(
         "gaia_activity_detail.html",
         title=title,
         activity_id=activity_id,
-        date_key=date_key,
+        date_key=date_key.isoformat(),
         catalog_name=catalog_name,
         gaia_display_name=cfg.gaia_display_name,
         min_price=float(min_price) if min_price else None,
@@ -444,77 +538,27 @@ def tiga_trends():
     end_date = _date.today()
     start_date = end_date - timedelta(days=6)
 
-    start_date_str = request.args.get("start_date", start_date.isoformat())
-    end_date_str = request.args.get("end_date", end_date.isoformat())
+    start_date = date_arg("start_date", start_date)
+    end_date = date_arg("end_date", end_date)
     activity_id = request.args.get("activity_id", "").strip()
-    dimensions = request.args.getlist("dimensions") or [
-        "collect_count", "total_comment.count", "total_comment.average",
-        "activityType.one_week_uv", "activityType.two_month_uv", "activityType.history_signup_count"
-    ]
-
-    where_sql = "WHERE date_key >= %s AND date_key <= %s AND platform = %s"
-    params = [start_date_str, end_date_str, "tiga"]
-
-    if activity_id:
-        where_sql += " AND activity_id = %s"
-        params.append(activity_id)
-
-    sql = f"""
-        SELECT activity_id,
-               activity_data->>'title' AS title,
-               date_key,
-               COALESCE(NULLIF(activity_data->>'collect_count','')::int, 0) AS collect_count,
-               COALESCE(NULLIF(activity_data->'total_comment'->>'count','')::int, 0) AS total_comment_count,
-               NULLIF(activity_data->'total_comment'->>'average','')::numeric AS total_comment_average,
-               COALESCE(NULLIF(activity_data->'activity_times'->'times'->0->'status'->'activityType'->>'one_week_uv','')::int, 0) AS one_week_uv,
-               COALESCE(NULLIF(activity_data->'activity_times'->'times'->0->'status'->'activityType'->>'two_month_uv','')::int, 0) AS two_month_uv,
-               COALESCE(NULLIF(activity_data->'activity_times'->'times'->0->'status'->'activityType'->>'history_signup_count','')::int, 0) AS history_signup_count
-        FROM activity_detail
-        {where_sql}
-        ORDER BY activity_id, date_key
-    """
-
-    with pg_connect() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, params)
-            rows = [
-                {
-                    "activity_id": r[0],
-                    "title": r[1] or "",
-                    "date_key": r[2],
-                    "collect_count": r[3] or 0,
-                    "total_comment_count": r[4] or 0,
-                    "total_comment_average": float(r[5]) if r[5] is not None else None,
-                    "one_week_uv": r[6] or 0,
-                    "two_month_uv": r[7] or 0,
-                    "history_signup_count": r[8] or 0,
-                }
-                for r in cur.fetchall()
-            ]
-
-    # 组织数据按activity_id分组
-    trend_data = {}
-    for row in rows:
-        aid = row["activity_id"]
-        if aid not in trend_data:
-            trend_data[aid] = {
-                "title": row["title"],
-                "activity_id": aid,
-                "dates": [],
-                "data": {dim: [] for dim in dimensions}
-            }
+    dimensions, max_points = trend_args("tiga")
+
+    # 分组与降采样后的列式结果一并缓存：同一范围与参数的重复访问不再转换
+    def compute() -> List[Dict[str, Any]]:
+        rows = fetch_trend_rows("tiga", start_date, end_date, activity_id)
+        selected = {d: TREND_DIMENSIONS["tiga"][d] for d in dimensions}
+        with phase("transform"):
+            return pivot(rows, TREND_COLUMNS["tiga"], selected, max_points)
 
-        trend_data[aid]["dates"].append(row["date_key"])
-        for dim in dimensions:
-            key = dim.replace(".", "_").replace("activityType.", "")
-            trend_data[aid]["data"][dim].append(row.get(key, 0))
+    trend_data = cached("tiga_trends", "tiga", (start_date, end_date, activity_id, tuple(dimensions), max_points), compute)
 
-    cfg = BaseConfig.from_env()
-    return render_template(
+    cfg = web_config()
+    return render_page(
         "tiga_trends.html",
-        trend_data=list(trend_data.values()),
-        start_date=start_date_str,
-        end_date=end_date_str,
+        trend_data=trend_data,
+        max_points=max_points or "",
+        start_date=start_date.isoformat(),
+        end_date=end_date.isoformat(),
         activity_id=activity_id,
         dimensions=dimensions,
         tiga_display_name=cfg.tiga_display_name,
@@ -534,30 +578,21 @@ def tiga_activity_detail(activity_id: str):
     if not _require_login():
         return redirect(url_for("login"))
     from datetime import date as _date
-    date_key = request.args.get("date", _date.today().isoformat())
-
-    sql = """
-        SELECT activity_data
-        FROM activity_detail
-        WHERE activity_id = %s AND date_key = %s AND platform = %s
-        LIMIT 1
-    """
-    with pg_connect() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, (activity_id, date_key, "tiga"))
-            row = cur.fetchone()
-            if not row:
-                cfg = BaseConfig.from_env()
-                return render_template("tiga_activity_detail.html",
-                                      title="未找到数据",
-                                      activity_id=activity_id,
-                                      date_key=date_key,
-                                      tiga_display_name=cfg.tiga_display_name,
-                                      default_min_person="-",
-                                      default_max_person="-",
-                                      times=[],
-                                      times_count=0)
-            activity = row[0]
+    date_key = date_arg("date", _date.today())
+
+    found = get_reader().activity_document("tiga", activity_id, date_key)
+    if found is None:
+        cfg = web_config()
+        return render_page("tiga_activity_detail.html",
+                              title="未找到数据",
+                              activity_id=activity_id,
+                              date_key=date_key.isoformat(),
+                              tiga_display_name=cfg.tiga_display_name,
+                              default_min_person="-",
+                              default_max_person="-",
+                              times=[],
+                              times_count=0)
+    activity = found[0]
 
     def _get(d, path, default=None):
         cur = d
@@ -592,12 +627,12 @@ def tiga_activity_detail(activity_id: str):
             "money": int(t.get("money") or 0),
         })
 
-    cfg = BaseConfig.from_env()
-    return render_template(
+    cfg = web_config()
+    return render_page(
         "tiga_activity_detail.html",
         title=title,
         activity_id=activity_id,
-        date_key=date_key,
+        date_key=date_key.isoformat(),
         tiga_display_name=cfg.tiga_display_name,
         default_min_person=default_min_person if default_min_person is not None else "-",
         default_max_person=default_max_person if default_max_person is not None else "-",
@@ -606,9 +641,96 @@ def tiga_activity_detail(activity_id: str):
     )
 
 
+def export_response(name: str, columns: Tuple[str, ...], rows: Iterator[Tuple[Any, ...]]) -> Any:
+    # 流式输出：行从服务端游标逐批取出、逐批序列化，内存占用与结果大小无关
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"unsupported format: {fmt}"}), 400
+    use_gzip = request.accept_encodings.quality("gzip") > 0
+    response = Response(
+        stream_with_context(encode_chunks(serialize(fmt, columns, rows), gzip=use_gzip)),
+        content_type=EXPORT_FORMATS[fmt],
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="{name}.{fmt}"'
+    response.headers["Vary"] = "Accept-Encoding"
+    if use_gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+@app.route("/api/<platform>/activities")
+def api_activities(platform: str):
+    if not _require_login():
+        return jsonify({"error": "unauthorized"}), 401
+    if platform not in EXPORT_COLUMNS:
+        return jsonify({"error": f"unknown platform: {platform}"}), 404
+    # 参数与仪表板一致：date、q、sort、order、type（tiga）/ catalog（gaia）；不分页，返回当天全部结果
+    date_key = date_arg("date", date.today())
+    _, sort_column = sort_arg(platform, next(iter(SORT_COLUMNS[platform])))
+    query = DashboardQuery(
+        platform=platform,
+        date_key=date_key,
+        columns=EXPORT_COLUMNS[platform],
+        sort_column=sort_column,
+        descending=request.args.get("order", "desc") != "asc",
+        q=request.args.get("q", "").strip(),
+        membership=membership_arg(platform),
+    )
+    rows = get_reader().export_rows(query)
+    return export_response(f"{platform}-activities-{date_key.isoformat()}", query.columns, rows)
+
+
+@app.route("/api/<platform>/trends")
+def api_trends(platform: str):
+    if not _require_login():
+        return jsonify({"error": "unauthorized"}), 401
+    if platform not in TREND_COLUMNS:
+        return jsonify({"error": f"unknown platform: {platform}"}), 404
+    # 参数与趋势页一致：start_date、end_date（默认最近 7 天）、activity_id
+    end_date = date_arg("end_date", date.today())
+    start_date = date_arg("start_date", end_date - timedelta(days=6))
+    activity_id = request.args.get("activity_id", "").strip()
+    rows = iter_trend_rows(platform, start_date, end_date, activity_id)
+    name = f"{platform}-trends-{start_date.isoformat()}-{end_date.isoformat()}"
+    return export_response(name, TREND_COLUMNS[platform], rows)
+
+
+@app.route("/healthz")
+def healthz():
+    try:
+        get_reader().ping()
+    except Exception as e:
+        log.warning("healthz_failed err=%s", e)
+        return jsonify({"status": "error"}), 503
+    return jsonify({"status": "ok"})
+
+
+@app.route("/stats/cache")
+def cache_stats():
+    if not _require_login():
+        return redirect(url_for("login"))
+    return jsonify(get_result_cache().stats())
+
+
+@app.route("/metrics")
+def metrics():
+    # Prometheus 文本格式
+    if not _metrics_allowed():
+        return Response("unauthorized\n", status=401, content_type="text/plain; charset=utf-8")
+    return Response(latency_histograms.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.route("/stats/pool")
+def pool_stats():
+    if not _require_login():
+        return redirect(url_for("login"))
+    # Postgres：psycopg_pool 自带统计（含 requests_wait_ms 等）+ 本进程记录的借用等待时间
+    return jsonify(get_reader().stats())
+
+
 def create_app() -> Flask:
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
-    cfg = BaseConfig.from_env()
+    cfg = web_config()
     app.secret_key = cfg.secret_key
     return app
 